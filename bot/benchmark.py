@@ -0,0 +1,216 @@
+"""
+Бенчмарк гарячих шляхів AddressBook на синтетичних книгах різного розміру.
+
+Для кожного розміру книги вимірюються add_contact, change_contact, show_phone,
+show_all, get_upcoming_birthdays, save_to_file і load_from_file: час одного
+виклику (середній, p50, p95) та пікова пам'ять (tracemalloc, окремим прогоном).
+Результати записуються у JSON, який можна порівняти з базовим.
+
+Запуск:
+    python benchmark.py --output results.json
+    python benchmark.py --sizes 10000 --baseline baseline.json
+    python benchmark.py --compare results.json --baseline baseline.json
+
+Код завершення 1 означає, що порівняння з базовим знайшло регресії.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+import bot
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# Скільки разів викликається кожна швидка операція; повільні (show_all, save, load)
+# викликаються SLOW_CALLS разів
+FAST_CALLS = 1000
+SLOW_CALLS = 3
+
+_FIRST_BIRTHDAY = date(1950, 1, 1).toordinal()
+
+def build_book(size):
+    """Створює книгу з size синтетичних контактів: ім'я, телефон і день народження."""
+    book = bot.AddressBook()
+    for i in range(size):
+        ordinal = _FIRST_BIRTHDAY + (i * 7919) % (50 * 365)
+        book.add_record(bot.Record._restore(f"Contact{i:07d}", [f"{i:010d}"], ordinal))
+    return book
+
+def _consume(result):
+    """Дочитує потокову відповідь обробника, щоб виміряти всю роботу."""
+    if not isinstance(result, str):
+        for _ in result:
+            pass
+
+def _operations(book, size, workdir):
+    """
+    Повертає {назва: (кількість викликів, функція(i))} для книги book.
+    Кожна функція виконує один виклик операції; i — номер виклику.
+    """
+    rng = random.Random(size)
+    names = [f"Contact{rng.randrange(size):07d}" for _ in range(FAST_CALLS)]
+    filename = os.path.join(workdir, f"bench_{size}.bin")
+
+    def add_contact(i):
+        bot.add_contact([f"Bench{i:07d}", f"{i:010d}"], book)
+
+    def change_contact(i):
+        name = names[i % FAST_CALLS]
+        current = book.find(name).phones[0].value
+        bot.change_contact([name, current, f"{(int(current) + 1) % 10**10:010d}"], book)
+
+    def show_phone(i):
+        bot.show_phone([names[i % FAST_CALLS]], book)
+
+    def show_all(i):
+        # Без кешу відповідей: інакше вимірювалися б лише влучання в нього
+        book._results.clear()
+        _consume(bot.show_all([], book))
+
+    def get_upcoming_birthdays(i):
+        book.get_upcoming_birthdays()
+
+    def save_to_file(i):
+        book.save_to_file(filename)
+
+    def load_from_file(i):
+        bot.AddressBook.load_from_file(filename).close()
+
+    return {
+        "add_contact": (FAST_CALLS, add_contact),
+        "change_contact": (FAST_CALLS, change_contact),
+        "show_phone": (FAST_CALLS, show_phone),
+        "show_all": (SLOW_CALLS, show_all),
+        "get_upcoming_birthdays": (FAST_CALLS, get_upcoming_birthdays),
+        "save_to_file": (SLOW_CALLS, save_to_file),
+        "load_from_file": (SLOW_CALLS, load_from_file),
+    }
+
+def _percentile(ordered, percent):
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+def measure(calls, operation, memory=True):
+    """Вимірює час кожного з calls викликів і, за потреби, пікову пам'ять окремим викликом."""
+    durations = []
+    for i in range(calls):
+        start = time.perf_counter_ns()
+        operation(i)
+        durations.append(time.perf_counter_ns() - start)
+    durations.sort()
+    result = {
+        "calls": calls,
+        "mean_us": round(sum(durations) / calls / 1e3, 3),
+        "p50_us": round(_percentile(durations, 50) / 1e3, 3),
+        "p95_us": round(_percentile(durations, 95) / 1e3, 3),
+    }
+    if memory:
+        # Пам'ять міряється окремо: під tracemalloc час виконання спотворюється
+        tracemalloc.start()
+        operation(calls)
+        result["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return result
+
+def run(sizes, memory=True, log=sys.stderr):
+    """Запускає всі вимірювання і повертає результати у вигляді словника."""
+    bot.disable_colors()
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            start = time.perf_counter()
+            book = build_book(size)
+            log.write(f"Книга на {size} контактів створена за {time.perf_counter() - start:.1f} с\n")
+            size_results = results["results"][str(size)] = {}
+            for name, (calls, operation) in _operations(book, size, workdir).items():
+                size_results[name] = measure(calls, operation, memory)
+                log.write(f"  {name}: {size_results[name]}\n")
+    return results
+
+def compare(current, baseline, threshold):
+    """
+    Порівнює результати з базовими. Регресія — це зростання середнього часу
+    або пікової пам'яті більше ніж на threshold (0.2 = 20%).
+    Повертає список рядків звіту та кількість регресій.
+    """
+    lines, regressions = [], 0
+    header = f"{'розмір':>9} {'операція':<24}{'метрика':<10}{'база':>12}{'зараз':>12}{'зміна':>9}"
+    lines.append(header)
+    for size, operations in current["results"].items():
+        for name, values in operations.items():
+            base = baseline["results"].get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric in ("mean_us", "peak_kib"):
+                if metric not in values or metric not in base or not base[metric]:
+                    continue
+                ratio = values[metric] / base[metric]
+                flag = ""
+                if ratio > 1 + threshold:
+                    flag = "  РЕГРЕСІЯ"
+                    regressions += 1
+                lines.append(
+                    f"{size:>9} {name:<24}{metric:<10}{base[metric]:>12}{values[metric]:>12}"
+                    f"{ratio - 1:>+9.1%}{flag}"
+                )
+    return lines, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк гарячих шляхів AddressBook.")
+    parser.add_argument(
+        "--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+        help="розміри книг через кому (за замовчуванням %(default)s)",
+    )
+    parser.add_argument("--output", metavar="FILE", help="записати результати у JSON-файл")
+    parser.add_argument("--no-memory", action="store_true", help="не вимірювати пікову пам'ять")
+    parser.add_argument("--baseline", metavar="FILE", help="порівняти результати з базовими з цього файлу")
+    parser.add_argument(
+        "--compare", metavar="FILE",
+        help="не запускати вимірювання, а порівняти з --baseline уже збережені результати",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="допустиме погіршення відносно бази (за замовчуванням %(default)s = 20%%)",
+    )
+    options = parser.parse_args(argv)
+
+    if options.compare:
+        if not options.baseline:
+            parser.error("--compare потребує --baseline")
+        with open(options.compare, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        sizes = [int(size) for size in options.sizes.split(",") if size]
+        current = run(sizes, memory=not options.no_memory)
+        data = json.dumps(current, ensure_ascii=False, indent=2)
+        if options.output:
+            with open(options.output, "w", encoding="utf-8") as f:
+                f.write(data + "\n")
+        else:
+            print(data)
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressions = compare(current, baseline, options.threshold)
+        print("\n".join(lines))
+        print(f"Регресій: {regressions}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
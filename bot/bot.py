@@ -1,36 +1,107 @@
+import time
+
+# Для --startup-report: скільки тривав імпорт модулів і виконання самого bot.py
+_IMPORT_STARTED = time.perf_counter()
+
+import argparse
+import calendar
+import csv
+import gc
+import glob
+import heapq
+import io
+import json
+import math
+import os
 import pickle
-from collections import UserDict, defaultdict
-from datetime import datetime, timedelta
-from colorama import Fore, Style, init
+import re
+import shutil
+import signal
+import struct
+import sys
+import threading
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, UserDict, defaultdict, deque
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import wraps
+from operator import itemgetter
+from itertools import chain, groupby, islice
+from datetime import date, datetime, timedelta
+
+# asyncio, sqlite3, concurrent.futures, cProfile, tracemalloc і colorama імпортуються там,
+# де вони потрібні (сервер, сховище SQLite, шарди, профілювання, кольори): без них
+# діалоговий режим запускається помітно швидше
+
+try:
+    import readline
+except ImportError:
+    # Наприклад, Windows: бот працює і без нього, лише без доповнення клавішею Tab
+    readline = None
+
+_IMPORTS_DONE = time.perf_counter()
 
 # --- Инициализация и Декоратор ---
 
-# Инициализируем colorama для корректной работы на разных ОС
-init(autoreset=True)
+class _NoColor:
+    """Заміна Fore і Style з colorama, коли кольори вимкнено: усі коди — порожні рядки."""
+    def __getattr__(self, name):
+        return ""
+
+# Коди кольорів; до виклику enable_colors() кольорів немає, а colorama не імпортується
+Fore = Style = _NoColor()
+
+def enable_colors():
+    """Імпортує colorama і вмикає кольоровий вивід (на Windows — через обгортки потоків)."""
+    global Fore, Style
+    import colorama
+    # Инициализируем colorama для корректной работы на разных ОС
+    colorama.init(autoreset=True)
+    Fore, Style = colorama.Fore, colorama.Style
+
+def disable_colors():
+    """Вимикає кольоровий вивід і повертає стандартні потоки без обгорток colorama."""
+    global Fore, Style
+    if not isinstance(Fore, _NoColor):
+        import colorama
+        colorama.deinit()
+    Fore = Style = _NoColor()
+
+class ErrorMessage(str):
+    """Рядок з повідомленням про помилку, яке повернув обробник команди."""
+
+def error_message(text):
+    return ErrorMessage(Fore.RED + text + Style.RESET_ALL)
+
+class UserError(ValueError):
+    """Помилка, повідомлення якої показується користувачу як є."""
 
 def input_error(func):
     """
     Декоратор для обработки исключений KeyError, ValueError и IndexError,
     возникающих в функциях-обработчиках команд.
     """
+    @wraps(func)
     def inner(*args, **kwargs):
         try:
             return func(*args, **kwargs)
         except KeyError: 
             # Ошибка возникает, когда ключ (имя контакта) не найден в словаре.
-            return Fore.RED + "Контакт не знайдено." + Style.RESET_ALL
+            return error_message("Контакт не знайдено.")
         except ValueError as e:
             # Улучшенная обработка ValueError для более точных сообщений
-            if "Номер телефону" in str(e) or "Invalid date format" in str(e) or "Старий номер телефону" in str(e):
-                return Fore.RED + str(e) + Style.RESET_ALL
+            if isinstance(e, UserError):
+                return error_message(str(e))
             # Общая ошибка распаковки (не хватает аргументов)
-            return Fore.RED + "Введіть ім'я та номер телефону, будь ласка." + Style.RESET_ALL 
+            return error_message("Введіть ім'я та номер телефону, будь ласка.")
         except IndexError: 
             # Ошибка возникает при попытке доступа к несуществующему индексу (например, 'phone' без аргументов).
-            return Fore.RED + "Введіть аргументи для команди." + Style.RESET_ALL
+            return error_message("Введіть аргументи для команди.")
         except Exception as e:
             # Общий обработчик для непредвиденных ошибок
-            return Fore.RED + f"Виникла непередбачена помилка: {e}" + Style.RESET_ALL
+            return error_message(f"Виникла непередбачена помилка: {e}")
     return inner
 
 # --- Функции Парсера ---
@@ -49,11 +120,73 @@ def parse_input(user_input):
 
 # --- ООП-Модели ---
 
+# Символ, більший за будь-який інший: key + _MAX_CHAR — верхня межа для рядків з префіксом key
+_MAX_CHAR = "\U0010ffff"
+
+def normalize_name(name):
+    """Нормалізує ім'я для пошуку: Unicode NFKC і порівняння без урахування регістру."""
+    return unicodedata.normalize("NFKC", name).casefold()
+
+def _bounded_distance(a, b, limit):
+    """
+    Відстань Дамерау–Левенштейна між a і b (перестановка сусідніх символів — одна правка)
+    або limit + 1, якщо вона більша за limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+# re.ASCII: \d без нього приймає й інші цифри Unicode (арабські, деванагарі тощо)
+_DATE_RE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})", re.ASCII)
+
+def is_ascii_number(value):
+    """Перевіряє, що рядок складається лише з цифр 0-9 (str.isdigit приймає й ², ٣ тощо)."""
+    return value.isascii() and value.isdigit()
+
+def is_valid_phone(value):
+    """Перевіряє, що номер телефону складається рівно з 10 цифр 0-9."""
+    return is_ascii_number(value) and len(value) == 10
+
+def parse_date_ordinal(value):
+    """
+    Розбирає дату DD.MM.YYYY і повертає її порядковий номер (date.toordinal)
+    або None, якщо дата некоректна. Виключень не викликає.
+    """
+    match = _DATE_RE.fullmatch(value)
+    if match is None:
+        return None
+    day, month, year = map(int, match.groups())
+    if not (1 <= month <= 12 and year >= 1 and 1 <= day <= calendar.monthrange(year, month)[1]):
+        return None
+    return date(year, month, day).toordinal()
+
 class Field:
     """Базовий клас для всіх полів запису."""
+    # Слоти замість __dict__ суттєво зменшують розмір кожного поля
+    __slots__ = ("_value",)
+
     def __init__(self, value):
         self._value = value
 
+    def __getstate__(self):
+        return {"_value": self._value}
+
+    def __setstate__(self, state):
+        # Файли, збережені до переходу на слоти, теж містять словник з _value
+        self._value = state["_value"]
+
     @property
     def value(self):
         return self._value
@@ -62,68 +195,285 @@ class Field:
     def value(self, new_value):
         self._value = new_value
 
+    @classmethod
+    def _trusted(cls, value):
+        """Створює поле з уже перевіреного значення, оминаючи валідацію."""
+        field = cls.__new__(cls)
+        field._value = value
+        return field
+
     def __str__(self):
         return str(self._value)
 
 class Name(Field):
     """Клас для зберігання імені контакту."""
-    pass
+    __slots__ = ()
 
 class Phone(Field):
     """Клас для зберігання номера телефону з валідацією (10 цифр)."""
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value 
 
     @Field.value.setter
     def value(self, new_value):
-        if not (new_value.isdigit() and len(new_value) == 10):
-            raise ValueError("Номер телефону повинен містити 10 цифр.")
+        if not is_valid_phone(new_value):
+            raise UserError("Номер телефону повинен містити 10 цифр.")
         self._value = new_value
 
 class Birthday(Field):
-    """Клас для зберігання дати народження з валідацією формату DD.MM.YYYY."""
+    """
+    Клас для зберігання дати народження з валідацією формату DD.MM.YYYY.
+    Дата зберігається вже розібраною — як порядковий номер дня (date.toordinal),
+    а value повертає її у форматі DD.MM.YYYY.
+    """
+    __slots__ = ()
+
     def __init__(self, value):
         self.value = value
 
-    @Field.value.setter
+    @property
+    def value(self):
+        day = date.fromordinal(self._value)
+        return f"{day.day:02d}.{day.month:02d}.{day.year:04d}"
+
+    @value.setter
     def value(self, new_value):
-        try:
-            # Перевірка коректності формату DD.MM.YYYY
-            datetime.strptime(new_value, "%d.%m.%Y")
-        except ValueError:
+        # Перевірка коректності формату DD.MM.YYYY
+        ordinal = parse_date_ordinal(new_value)
+        if ordinal is None:
             # Якщо формат невірний, викликаємо помилку
-            raise ValueError("Invalid date format. Use DD.MM.YYYY")
+            raise UserError("Invalid date format. Use DD.MM.YYYY")
         
-        self._value = new_value
+        self._value = ordinal
+
+    @classmethod
+    def from_ordinal(cls, ordinal):
+        """Створює Birthday з уже перевіреного порядкового номера дня, без розбору рядка."""
+        return cls._trusted(ordinal)
+
+    @property
+    def date(self):
+        """Дата народження як об'єкт date."""
+        return date.fromordinal(self._value)
+
+    @property
+    def ordinal(self):
+        """Порядковий номер дня народження (date.toordinal)."""
+        return self._value
+
+    def __str__(self):
+        return self.value
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        # Старі файли зберігали дату рядком DD.MM.YYYY
+        if isinstance(self._value, str):
+            self.value = self._value
+
+class NameIndex:
+    """
+    Відсортований індекс імен контактів за нормалізованою формою (normalize_name).
+    Зберігається блоками обмеженого розміру, тож вставка й видалення зсувають
+    лише один блок, а пошук діапазону коштує O(log N + k).
+    """
+    # Блок, що виріс удвічі більшим за цей розмір, ділиться навпіл
+    BLOCK_SIZE = 512
+
+    def __init__(self, names=()):
+        entries = sorted((normalize_name(name), name) for name in names)
+        size = self.BLOCK_SIZE
+        self._keys = [[key for key, _ in entries[i:i + size]] for i in range(0, len(entries), size)]
+        self._names = [[name for _, name in entries[i:i + size]] for i in range(0, len(entries), size)]
+        # Найбільший ключ кожного блоку — для бінарного пошуку потрібного блоку
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._len = len(entries)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, name):
+        key = normalize_name(name)
+        if not self._keys:
+            self._keys.append([key])
+            self._names.append([name])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        block = min(bisect_right(self._maxes, key), len(self._maxes) - 1)
+        keys, names = self._keys[block], self._names[block]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        names.insert(position, name)
+        self._maxes[block] = keys[-1]
+        self._len += 1
+        if len(keys) > 2 * self.BLOCK_SIZE:
+            half = len(keys) // 2
+            self._keys[block:block + 1] = [keys[:half], keys[half:]]
+            self._names[block:block + 1] = [names[:half], names[half:]]
+            self._maxes[block:block + 1] = [keys[half - 1], keys[-1]]
+
+    def remove(self, name):
+        key = normalize_name(name)
+        block = bisect_left(self._maxes, key)
+        # Однакові ключі (наприклад, "Olena" та "olena") можуть займати кілька блоків
+        while block < len(self._keys):
+            keys, names = self._keys[block], self._names[block]
+            position = bisect_left(keys, key)
+            while position < len(keys) and keys[position] == key:
+                if names[position] == name:
+                    del keys[position]
+                    del names[position]
+                    self._len -= 1
+                    if keys:
+                        self._maxes[block] = keys[-1]
+                    else:
+                        del self._keys[block], self._names[block], self._maxes[block]
+                    return
+                position += 1
+            block += 1
+        raise KeyError(name)
+
+    def _range(self, low, high):
+        """Перебирає пари (ключ, ім'я) з low <= ключ < high у порядку індексу."""
+        block = bisect_left(self._maxes, low)
+        if block >= len(self._keys):
+            return
+        position = bisect_left(self._keys[block], low)
+        for keys, names in zip(self._keys[block:], self._names[block:]):
+            for index in range(position, len(keys)):
+                if keys[index] >= high:
+                    return
+                yield keys[index], names[index]
+            position = 0
+
+    def prefix(self, prefix_key):
+        """Перебирає пари (ключ, ім'я), ключ яких починається з prefix_key."""
+        return self._range(prefix_key, prefix_key + _MAX_CHAR)
+
+    def count_prefix(self, prefix_key):
+        """Кількість імен, ключ яких починається з prefix_key."""
+        low, high = prefix_key, prefix_key + _MAX_CHAR
+        first, last = bisect_left(self._maxes, low), bisect_left(self._maxes, high)
+        if first >= len(self._keys):
+            return 0
+        if first == last:
+            keys = self._keys[first]
+            return bisect_left(keys, high) - bisect_left(keys, low)
+        count = len(self._keys[first]) - bisect_left(self._keys[first], low)
+        count += sum(len(keys) for keys in self._keys[first + 1:last])
+        if last < len(self._keys):
+            count += bisect_left(self._keys[last], high)
+        return count
+
+    def __iter__(self):
+        """Усі імена в порядку індексу."""
+        for names in self._names:
+            yield from names
 
 class Record:
     """Клас для зберігання інформації про контакт: ім'я, телефони та день народження."""
+    __slots__ = ("name", "phones", "birthday", "_phone_map", "_book")
+
     def __init__(self, name):
         self.name = Name(name)
         self.phones = []
         self.birthday = None 
+        # Індекс номер -> Phone, щоб find_phone працював за O(1)
+        self._phone_map = {}
+        # Книга, що містить запис (встановлюється в AddressBook.add_record)
+        self._book = None
+
+    def __getstate__(self):
+        # Індекс і посилання на книгу не зберігаємо — вони відновлюються при завантаженні
+        return {"name": self.name, "phones": self.phones, "birthday": self.birthday}
+
+    def __setstate__(self, state):
+        # Підходить і для записів, збережених до переходу на слоти (зі словником __dict__)
+        self.name = state["name"]
+        self.phones = state["phones"]
+        self.birthday = state.get("birthday")
+        self._book = None
+        self._phone_map = {}
+        for phone in self.phones:
+            self._phone_map.setdefault(phone.value, phone)
+
+    @classmethod
+    def _restore(cls, name, numbers, ordinal=None, repeated=False):
+        """
+        Створює запис з уже перевірених номерів і дати, не валідуючи їх повторно.
+        Повторні номери відкидаються, а з repeated=True лишаються в phones
+        (як у базі, записаній до їх заборони), щоб їх знайшов і прибрав dedupe.
+        """
+        record = cls(name)
+        for number in numbers:
+            if number not in record._phone_map:
+                phone = Phone._trusted(number)
+                record.phones.append(phone)
+                record._phone_map[number] = phone
+            elif repeated:
+                record.phones.append(Phone._trusted(number))
+        if ordinal is not None:
+            record.birthday = Birthday.from_ordinal(ordinal)
+        return record
+
+    @contextmanager
+    def _changing(self, op, *args):
+        """
+        Повідомляє книгу про зміну запису: до і після зміни оновлюються індекси,
+        а успішна операція op(*args) передається книзі (наприклад, для журналу).
+        """
+        book = self._book
+        if book is None:
+            yield
+            return
+        with book._write_locked():
+            book._remember(self.name.value)
+            book._begin_change(self)
+            try:
+                yield
+            finally:
+                book._end_change(self)
+            book._record_changed(self, op, args)
+
+    def _forget_phone(self, phone_number):
+        """Прибирає номер з індексу запису, залишаючи дублікат, якщо він є у списку."""
+        del self._phone_map[phone_number]
+        for phone in self.phones:
+            if phone.value == phone_number:
+                self._phone_map[phone_number] = phone
+                break
+
+    def _check_new_phone(self, phone_number):
+        if phone_number in self._phone_map:
+            raise UserError(f"Номер телефону {phone_number} вже є у контакту {self.name.value}.")
 
     def add_phone(self, phone_number):
-        """Додає новий об'єкт Phone в список."""
+        """Додає новий об'єкт Phone в список. Номер, який уже є у контакту, не додається."""
         phone = Phone(phone_number)
-        self.phones.append(phone)
+        self._check_new_phone(phone.value)
+        with self._changing("add_phone", phone.value):
+            self.phones.append(phone)
+            self._phone_map.setdefault(phone.value, phone)
 
     def add_birthday(self, birthday):
         """Додає день народження до контакту."""
-        self.birthday = Birthday(birthday)
+        birthday = Birthday(birthday)
+        with self._changing("add_birthday", birthday.value):
+            self.birthday = birthday
 
     def find_phone(self, phone_number):
         """Ищет объект Phone по строковому представлению номера."""
-        for phone in self.phones:
-            if phone.value == phone_number:
-                return phone
-        return None
+        return self._phone_map.get(phone_number)
 
     def remove_phone(self, phone_number):
         """Удаляет объект Phone из списка по номеру."""
         phone_to_remove = self.find_phone(phone_number)
         if phone_to_remove:
-            self.phones.remove(phone_to_remove)
+            with self._changing("remove_phone", phone_number):
+                self.phones.remove(phone_to_remove)
+                self._forget_phone(phone_number)
             return True
         return False
 
@@ -132,116 +482,2584 @@ class Record:
         phone_to_edit = self.find_phone(old_phone)
         
         if phone_to_edit:
-            # Присваивание вызывает сеттер Phone для валидации
-            phone_to_edit.value = new_phone
+            if new_phone != old_phone:
+                self._check_new_phone(new_phone)
+            with self._changing("edit_phone", old_phone, new_phone):
+                # Присваивание вызывает сеттер Phone для валидации
+                phone_to_edit.value = new_phone
+                self._forget_phone(old_phone)
+                self._phone_map.setdefault(phone_to_edit.value, phone_to_edit)
         else:
-            raise ValueError(f"Старий номер телефону {old_phone} не знайдено.")
+            raise UserError(f"Старий номер телефону {old_phone} не знайдено.")
+
+    def dedupe_phones(self):
+        """Прибирає повторні номери, залишаючи перше входження кожного. Повертає кількість прибраних."""
+        removed = len(self.phones) - len(self._phone_map)
+        if removed:
+            with self._changing("dedupe_phones"):
+                unique = {}
+                for phone in self.phones:
+                    unique.setdefault(phone.value, phone)
+                self.phones = list(unique.values())
+                self._phone_map = unique
+        return removed
 
     def __str__(self):
         phones_str = '; '.join(p.value for p in self.phones)
         birthday_str = f", birthday: {self.birthday.value}" if self.birthday else ""
         return f"Contact name: {self.name.value}, phones: {phones_str}{birthday_str}"
 
+@contextmanager
+def atomic_write(filename, backup=None):
+    """
+    Відкриває для запису тимчасовий файл, який після успішного запису, flush і fsync
+    атомарно підміняє filename. Збій посеред запису не зачіпає старий файл.
+    Якщо задано backup, попередня версія filename перейменовується в нього.
+    """
+    tmp_filename = filename + ".tmp"
+    try:
+        with open(tmp_filename, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    if backup is not None and os.path.exists(filename):
+        os.replace(filename, backup)
+    os.replace(tmp_filename, filename)
+    # Щоб перейменування пережило збій живлення, синхронізуємо й сам каталог (не на Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+class _BookUnpickler(pickle.Unpickler):
+    """
+    Unpickler знімків книги. Класи бота шукаються в цьому модулі, хоч би під яким
+    іменем модуля їх зберегли (__main__ при запуску python bot.py або bot при імпорті).
+    Будь-яке інше глобальне ім'я, крім кількох службових, — помилка: розпакування
+    довільного класу чи функції з файлу дозволило б виконати будь-який код.
+    """
+    def find_class(self, module, name):
+        if module in ("__main__", "bot") and name in _PICKLED_CLASSES:
+            return globals()[name]
+        if (module, name) in _PICKLED_BUILTINS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"недозволене ім'я у знімку книги: {module}.{name}")
+
+# Класи, що можуть трапитися у знімку книги
+_PICKLED_CLASSES = {
+    "Field", "Name", "Phone", "Birthday", "Record",
+    "AddressBook", "ConcurrentAddressBook", "NameIndex",
+}
+
+# Службові імена, якими pickle протоколів 0-1 відновлює об'єкти (і їхні назви з Python 2)
+_PICKLED_BUILTINS = {
+    ("copyreg", "_reconstructor"), ("copy_reg", "_reconstructor"),
+    ("builtins", "object"), ("__builtin__", "object"),
+}
+
+class Journal:
+    """
+    Журнал змін адресної книги у форматі JSON Lines.
+    Кожна зміна дописується одним рядком у кінець файлу, тож збій
+    не втрачає жодної виконаної команди. Кожен запис має порядковий номер seq:
+    при відтворенні пропускаються записи, які вже увійшли до знімка.
+    """
+    def __init__(self, path, sync=False):
+        self.path = path
+        # sync=True додатково викликає fsync після кожного запису
+        self.sync = sync
+        # Кількість записів з моменту останнього знімка
+        self.entries = 0
+        self._file = None
+
+    def replay(self, book, strict=True):
+        """
+        Застосовує до книги записи журналу, новіші за її знімок.
+        З strict=False записи, які не вдається застосувати (книгу відновлено
+        з резервного знімка, старшого за журнал), пропускаються.
+        Повертає кількість пропущених записів.
+        """
+        skipped = 0
+        try:
+            f = open(self.path, "rb+")
+        except FileNotFoundError:
+            return skipped
+        with f:
+            offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("обірваний запис")
+                    entry = json.loads(line)
+                except ValueError:
+                    # Недописаний хвіст після збою — відрізаємо його,
+                    # щоб нові записи не склеїлися з ним
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                self.entries += self._weight(entry)
+                if entry["seq"] > book._journal_seq:
+                    try:
+                        book._replay_journal_entry(entry)
+                    except (KeyError, ValueError):
+                        if strict:
+                            raise
+                        skipped += 1
+                    book._journal_seq = entry["seq"]
+        return skipped
+
+    @staticmethod
+    def _weight(entry):
+        # Пакет змін транзакції — один рядок, але для стиснення журналу важить як усі його зміни
+        return len(entry.get("changes", ())) or 1
+
+    def append(self, entry):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.entries += self._weight(entry)
+
+    def position(self):
+        """Повертає поточний розмір журналу в байтах."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def truncate(self, offset=None):
+        """
+        Очищує журнал після того, як його вміст увійшов до знімка.
+        Якщо задано offset (позиція журналу в момент знімка), записи після неї
+        залишаються: їх дописали вже після знімка, і він їх не містить.
+        """
+        self.close()
+        tail = b""
+        if offset is not None:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(tail)
+        os.replace(tmp_path, self.path)
+        self.entries = tail.count(b"\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class ResultCache:
+    """
+    Кеш відповідей на дорогі запити (birthdays, all) з витісненням найдавніше
+    використаних (LRU). Ключ починається з виду запиту і містить версію книги,
+    тож після будь-якої зміни старі відповіді більше не знаходяться і згодом витісняються.
+    Розмір обмежено кількістю відповідей і сумарною довжиною їхнього тексту.
+    """
+    def __init__(self, max_entries=64, max_chars=4_000_000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        # Ключ -> кортеж порцій тексту відповіді
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def get(self, key):
+        with self._lock:
+            chunks = self._entries.get(key)
+            if chunks is None:
+                self.misses[key[0]] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[key[0]] += 1
+            return chunks
+
+    def put(self, key, chunks):
+        size = sum(map(len, chunks))
+        if size > self.max_chars:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= sum(map(len, old))
+            self._entries[key] = chunks
+            self._chars += size
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= sum(map(len, evicted))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Забуває всі збережені відповіді (статистика влучань лишається)."""
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def summary(self):
+        """Повертає {вид запиту: {"hits", "misses", "hit_rate"}}, відсортовано за назвою."""
+        result = {}
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits[kind], self.misses[kind]
+            result[kind] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 3)}
+        return result
+
+class ChangeSequence:
+    """
+    Лічильник змін книги: кожна зміна запису отримує наступний номер.
+    Шарди розподіленої книги ділять один лічильник, тож номери змін усієї книги зростають.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value=0):
+        self.value = value
+
+    def next(self):
+        self.value += 1
+        return self.value
+
+# Вікно стрічки змін: «надгробки» видалених записів гарантовано зберігаються
+# для останніх FEED_RETENTION змін, старіші прибираються, щоб стрічка не росла без меж.
+# Курсор синхронізації, старший за це вікно, вимагає повної синхронізації (--since 0)
+FEED_RETENTION = 100_000
+
+def feed_floor(book):
+    """Найменший курсор (крім 0), після якого стрічка змін книги гарантовано повна."""
+    return max(book._sequence.value - FEED_RETENTION, 0)
+
+# --- Формат файлу книги ---
+
+# Знімок книги — це заголовок і тіло з колонками; усі числа little-endian.
+#   Заголовок: сигнатура, версія формату, прапорці (поки 0), CRC32 тіла,
+#              journal_seq, кількість записів N.
+#   Тіло: N довжин імен у байтах (uint32), N кількостей телефонів (uint32),
+#         N днів народження (порядковий номер дати, int32; 0 — немає),
+#         розмір таблиці імен (uint64) і сама таблиця (імена в UTF-8 підряд),
+#         кількість телефонів (uint64) і телефони як числа (uint64).
+#   З версії 2 далі йде стрічка змін: номер останньої зміни (uint64),
+#         N номерів останньої зміни кожного запису (uint64), кількість видалених
+#         імен T (uint64), T довжин їхніх імен (uint32), розмір таблиці цих імен (uint64)
+#         і сама таблиця, T номерів змін, якими їх видалено (uint64).
+# Записи йдуть у порядку додавання, телефони — підряд для кожного запису.
+BOOK_MAGIC = b"ADDRBOOK"
+BOOK_FORMAT_VERSION = 2
+_BOOK_HEADER = struct.Struct("<8sHHIQQ")
+_BOOK_COUNT = struct.Struct("<Q")
+
+def _column_bytes(column):
+    """Повертає вміст колонки array у порядку байтів little-endian."""
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def encode_book(book):
+    """Серіалізує записи книги та її стрічку змін у двійковий формат знімка."""
+    records = list(book.data.values())
+    names = [record.name.value.encode("utf-8") for record in records]
+    phones = array("Q", (int(phone.value) for record in records for phone in record.phones))
+    name_table = b"".join(names)
+    changed = book._changed
+    tombstones = [name for name in changed if name not in book.data]
+    tombstone_names = [name.encode("utf-8") for name in tombstones]
+    tombstone_table = b"".join(tombstone_names)
+    body = b"".join((
+        _column_bytes(array("I", map(len, names))),
+        _column_bytes(array("I", (len(record.phones) for record in records))),
+        _column_bytes(array("i", (record.birthday.ordinal if record.birthday else 0 for record in records))),
+        _BOOK_COUNT.pack(len(name_table)),
+        name_table,
+        _BOOK_COUNT.pack(len(phones)),
+        _column_bytes(phones),
+        _BOOK_COUNT.pack(book._sequence.value),
+        _column_bytes(array("Q", (changed[record.name.value] for record in records))),
+        _BOOK_COUNT.pack(len(tombstones)),
+        _column_bytes(array("I", map(len, tombstone_names))),
+        _BOOK_COUNT.pack(len(tombstone_table)),
+        tombstone_table,
+        _column_bytes(array("Q", (changed[name] for name in tombstones))),
+    ))
+    header = _BOOK_HEADER.pack(
+        BOOK_MAGIC, BOOK_FORMAT_VERSION, 0, zlib.crc32(body), book._journal_seq, len(records)
+    )
+    return header + body
+
+class _ColumnReader:
+    """Послідовно читає колонки з тіла знімка."""
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+
+    def take(self, size):
+        if self.offset + size > len(self.body):
+            raise UserError("Файл обірваний: колонка виходить за межі знімка.")
+        chunk = self.body[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def count(self):
+        return _BOOK_COUNT.unpack(self.take(_BOOK_COUNT.size))[0]
+
+    def column(self, typecode, length):
+        column = array(typecode)
+        column.frombytes(self.take(column.itemsize * length))
+        if sys.byteorder == "big":
+            column.byteswap()
+        return column
+
+def _split_names(table, lengths):
+    """Ділить таблицю імен (UTF-8 підряд) на імена за їхніми довжинами в байтах."""
+    # Якщо всі імена ASCII, довжини в байтах збігаються з довжинами в символах,
+    # і таблицю можна декодувати одним викликом
+    text = table.decode("utf-8")
+    source = text if len(text) == len(table) else table
+    names = []
+    start = 0
+    for length in lengths:
+        names.append(source[start:start + length])
+        start += length
+    if source is table:
+        names = [name.decode("utf-8") for name in names]
+    return names
+
+def decode_columns(data):
+    """
+    Розбирає знімок у двійковому форматі без створення об'єктів книги.
+    Повертає (journal_seq, список імен, кількості телефонів, дні народження,
+    рядок з усіма номерами підряд по 10 цифр, стрічка змін). Стрічка змін — це
+    (номер останньої зміни, номери змін записів, видалені імена, номери їх видалення)
+    або None для знімків версії 1. Такий результат компактний,
+    тож його дешево передати з процесу, що читав файл.
+    """
+    view = memoryview(data)
+    if len(view) < _BOOK_HEADER.size:
+        raise UserError("Файл обірваний: немає заголовка знімка.")
+    magic, version, _flags, checksum, journal_seq, count = _BOOK_HEADER.unpack_from(view)
+    if magic != BOOK_MAGIC:
+        raise UserError("Формат файлу не розпізнано.")
+    if version > BOOK_FORMAT_VERSION:
+        raise UserError(f"Формат файлу версії {version} новіший за підтримуваний ({BOOK_FORMAT_VERSION}).")
+    body = view[_BOOK_HEADER.size:]
+    if zlib.crc32(body) != checksum:
+        raise UserError("Файл пошкоджено: контрольна сума не збігається.")
+
+    reader = _ColumnReader(body)
+    name_lengths = reader.column("I", count)
+    phone_counts = reader.column("I", count)
+    birthdays = reader.column("i", count)
+    name_table = bytes(reader.take(reader.count()))
+    phones = reader.column("Q", reader.count())
+    names = _split_names(name_table, name_lengths)
+    numbers = "".join(f"{number:010d}" for number in phones)
+
+    feed = None
+    if version >= 2:
+        last_seq = reader.count()
+        seqs = reader.column("Q", count)
+        tombstone_count = reader.count()
+        tombstone_lengths = reader.column("I", tombstone_count)
+        tombstones = _split_names(bytes(reader.take(reader.count())), tombstone_lengths)
+        feed = last_seq, seqs, tombstones, reader.column("Q", tombstone_count)
+    return journal_seq, names, phone_counts, birthdays, numbers, feed
+
+def book_from_columns(cls, journal_seq, names, phone_counts, birthdays, numbers, feed=None):
+    """Створює книгу класу cls з колонок, які повертає decode_columns."""
+    records = {}
+    position = 0
+    state = {"data": records, "journal_seq": journal_seq}
+    # Усі створені тут об'єкти залишаються живими, тож збирач сміття лише марно
+    # обходив би їх під час масового створення
+    with _gc_paused():
+        for name, phone_count, ordinal in zip(names, phone_counts, birthdays):
+            end = position + 10 * phone_count
+            records[name] = Record._restore(
+                name, [numbers[i:i + 10] for i in range(position, end, 10)], ordinal or None
+            )
+            position = end
+        if feed is not None:
+            last_seq, seqs, tombstones, tombstone_seqs = feed
+            # Записи змінювали здебільшого в порядку додавання, тож сортування майже лінійне
+            changes = list(zip(seqs, names))
+            changes.extend(zip(tombstone_seqs, tombstones))
+            changes.sort()
+            state["feed"] = last_seq, {name: seq for seq, name in changes}
+        book = cls.__new__(cls)
+        book.__setstate__(state)
+    return book
+
+@contextmanager
+def _gc_paused():
+    """Вимикає збирач сміття на час блоку (якщо він був увімкнений)."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def decode_book(data, cls):
+    """Відновлює книгу класу cls зі знімка у двійковому форматі."""
+    return book_from_columns(cls, *decode_columns(data))
+
 class AddressBook(UserDict):
     """Клас для зберігання записів (Record) та керування ними, з функціоналом збереження/завантаження."""
-    
+
+    # Після скількох записів у журналі книга переписує знімок і очищує журнал
+    compact_every = 1000
+
+    def __init__(self, *args, **kwargs):
+        # Зворотний індекс: номер телефону -> множина імен контактів
+        self._phone_index = {}
+        # Календарний індекс: (місяць, день) народження -> множина імен контактів
+        self._birthday_index = {}
+        # Відсортований індекс імен для пошуку за префіксом
+        self._name_index = NameIndex()
+        self._init_journal()
+        self._init_cache()
+        self._init_feed(0, {})
+        super().__init__(*args, **kwargs)
+
+    def _init_cache(self):
+        # Версія книги: зростає з кожною зміною, тож відповідь із кешу,
+        # збережена для поточної версії, гарантовано актуальна
+        self._version = 0
+        self._results = ResultCache()
+
+    def _init_journal(self, journal_seq=0):
+        self._journal = None
+        self._filename = None
+        # Номер останнього запису журналу, що вже врахований у книзі
+        self._journal_seq = journal_seq
+        # Хто переписує знімок, коли журнал виріс: None — сама книга, одразу.
+        # Сервер і AutoSaver підставляють сюди фонове збереження
+        self._compactor = None
+        # Кількість змін з моменту останнього знімка
+        self._changes = 0
+        # Під час транзакції: ім'я -> стан запису до неї (None — запису не було)
+        self._undo = None
+        # Під час транзакції: порядок записів до першого додавання нового запису
+        # або видалення в ній
+        self._undo_order = None
+        # Під час транзакції: записи журналу, що потраплять у нього одним пакетом
+        # (None поза транзакцією)
+        self._pending = None
+
+    def _init_feed(self, last_seq=0, changed=None):
+        if changed is None:
+            # Знімок без стрічки змін: кожен запис вважається зміненим один раз, у порядку додавання
+            changed = dict(zip(self.data, range(1, len(self.data) + 1)))
+            last_seq = len(changed)
+        # Стрічка змін: ім'я -> номер останньої зміни запису, у порядку зростання номерів.
+        # Імена видалених записів лишаються в ній як «надгробки»
+        self._changed = changed
+        self._sequence = ChangeSequence(last_seq)
+        # Номер зміни, після якої стрічку змін знову буде очищено від застарілих надгробків
+        self._prune_at = 0
+
+    def __getstate__(self):
+        # Індекси не серіалізуємо, вони перебудовуються в __setstate__
+        return {
+            "data": self.data, "journal_seq": self._journal_seq,
+            "feed": (self._sequence.value, self._changed),
+        }
+
+    def __setstate__(self, state):
+        self.data = state["data"]
+        self._init_journal(state.get("journal_seq", 0))
+        self._init_cache()
+        self._init_feed(*state.get("feed", (0, None)))
+        self._phone_index = {}
+        self._birthday_index = {}
+        for record in self.data.values():
+            record._book = self
+            self._index_record(record)
+        self._name_index = NameIndex(self.data)
+
+    # Значення в індексах — це рядок, якщо ключ належить одному контакту
+    # (найчастіший випадок), або множина імен, якщо кільком.
+    # Так індекс не тримає окрему множину на кожен номер телефону.
+
+    @staticmethod
+    def _add_to(index, key, name):
+        names = index.get(key)
+        if names is None:
+            index[key] = name
+        elif isinstance(names, str):
+            if names != name:
+                index[key] = {names, name}
+        else:
+            names.add(name)
+
+    @staticmethod
+    def _discard_from(index, key, name):
+        names = index.get(key)
+        if names is None:
+            return
+        if isinstance(names, str):
+            if names == name:
+                del index[key]
+            return
+        names.discard(name)
+        if len(names) == 1:
+            index[key] = names.pop()
+
+    @staticmethod
+    def _names_in(index, key):
+        names = index.get(key, ())
+        return (names,) if isinstance(names, str) else names
+
+    @staticmethod
+    def _birthday_key(birthday):
+        """Повертає ключ календарного індексу (місяць, день) для дня народження."""
+        day = birthday.date
+        return day.month, day.day
+
+    def _index_record(self, record):
+        name = record.name.value
+        for phone_number in record._phone_map:
+            self._add_to(self._phone_index, phone_number, name)
+        if record.birthday is not None:
+            self._add_to(self._birthday_index, self._birthday_key(record.birthday), name)
+
+    def _unindex_record(self, record):
+        name = record.name.value
+        for phone_number in record._phone_map:
+            self._discard_from(self._phone_index, phone_number, name)
+        if record.birthday is not None:
+            self._discard_from(self._birthday_index, self._birthday_key(record.birthday), name)
+
+    # Record викликає ці методи навколо кожної своєї зміни
+    _begin_change = _unindex_record
+    _end_change = _index_record
+
+    def _write_locked(self):
+        """Контекст, у якому Record змінює себе. Звичайна книга не синхронізується між потоками."""
+        return nullcontext()
+
+    def _remember_order(self):
+        """Під час транзакції запам'ятовує порядок записів до першого додавання чи видалення в ній."""
+        if self._undo is not None and self._undo_order is None:
+            self._undo_order = list(self.data)
+
+    def _remember(self, name):
+        """Під час транзакції запам'ятовує стан запису name до його першої зміни в ній."""
+        if self._undo is None or name in self._undo:
+            return
+        record = self.data.get(name)
+        if record is None:
+            self._undo[name] = None
+            self._remember_order()
+        else:
+            ordinal = record.birthday.ordinal if record.birthday else None
+            self._undo[name] = ([phone.value for phone in record.phones], ordinal)
+
+    def _record_changed(self, record, op, args):
+        self._log(op, record.name.value, args=list(args))
+
+    def _log(self, op, name, **fields):
+        """Дописує операцію в журнал (якщо він підключений)."""
+        self._changes += 1
+        self._version += 1
+        if self._pending is None:
+            # У транзакції номери змін видаються під час її фіксації
+            self._mark_changed(name)
+        if self._journal is None:
+            return
+        entry = {"op": op, "name": name}
+        entry.update(fields)
+        if self._pending is not None:
+            self._pending.append(entry)
+            return
+        self._append_journal(entry)
+
+    def _mark_changed(self, name):
+        """Дає запису name наступний номер зміни і переносить його в кінець стрічки змін."""
+        self._changed.pop(name, None)
+        self._changed[name] = self._sequence.next()
+        if self._sequence.value >= self._prune_at:
+            self._prune_tombstones()
+
+    def _prune_tombstones(self):
+        """
+        Прибирає надгробки, старші за вікно FEED_RETENTION. Стрічка впорядкована
+        за номерами, тож перебір зупиняється на першій зміні у вікні; повторюється
+        він лише раз на чверть вікна, тож у середньому коштує O(1) на зміну.
+        """
+        cutoff = self._sequence.value - FEED_RETENTION
+        stale = []
+        for name, seq in self._changed.items():
+            if seq > cutoff:
+                break
+            if name not in self.data:
+                stale.append(name)
+        for name in stale:
+            del self._changed[name]
+        self._prune_at = self._sequence.value + max(FEED_RETENTION // 4, 1)
+
+    def _append_journal(self, entry):
+        self._journal_seq += 1
+        # change_seq — останній номер зміни, виданий записом: під час відтворення журналу
+        # зміни отримують ті самі номери (шарди ділять лічильник, тож без цього номери
+        # змін різних шардів після перезапуску збігалися б)
+        self._journal.append({"seq": self._journal_seq, **entry, "change_seq": self._sequence.value})
+        if self._journal.entries >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        """Переписує знімок, коли журнал виріс (сама книга або через _compactor)."""
+        if self._compactor is not None:
+            self._compactor(self)
+        else:
+            self.save_to_file(self._filename)
+
+    def _replay_journal_entry(self, entry):
+        """Повторює запис журналу, видаючи змінам ті самі номери, що й під час запису."""
+        change_seq = entry.get("change_seq")
+        if change_seq is None:
+            # Журнал, записаний до появи change_seq: номери видаються заново
+            self._apply_journal_entry(entry)
+            return
+        if entry["op"] == "batch":
+            # Транзакція нумерує змінені записи поспіль, по одному номеру на запис
+            count = len(dict.fromkeys(change["name"] for change in entry["changes"]))
+        else:
+            count = 1
+        self._sequence.value = change_seq - count
+        try:
+            self._apply_journal_entry(entry)
+        finally:
+            self._sequence.value = max(self._sequence.value, change_seq)
+
+    def _apply_journal_entry(self, entry):
+        """Повторює операцію з журналу над книгою."""
+        op, name = entry["op"], entry["name"]
+        if op == "batch":
+            # Як і під час запису, номери змін видаються разом на кінці транзакції
+            with self.transaction():
+                for change in entry["changes"]:
+                    self._apply_journal_entry(change)
+        elif op == "add_record":
+            record = Record(name)
+            # Журнали, записані до заборони повторних номерів, можуть їх містити
+            for phone in dict.fromkeys(entry["phones"]):
+                record.add_phone(phone)
+            if entry["birthday"] is not None:
+                record.add_birthday(entry["birthday"])
+            self.add_record(record)
+        elif op == "delete":
+            self.delete(name)
+        else:
+            # add_phone, edit_phone, remove_phone, add_birthday, dedupe_phones
+            record, args = self.data[name], entry["args"]
+            if op == "add_phone" and record.find_phone(args[0]) is not None:
+                # Повторний номер зі старого журналу: результат той самий, що після dedupe
+                return
+            if op == "edit_phone" and args[0] != args[1] and record.find_phone(args[1]) is not None:
+                record.remove_phone(args[0])
+                return
+            getattr(record, op)(*args)
+
     def add_record(self, record):
-        self.data[record.name.value] = record
+        name = record.name.value
+        self._remember(name)
+        old_record = self.data.get(name)
+        if old_record is not None and old_record is not record:
+            self._unindex_record(old_record)
+            old_record._book = None
+        if old_record is None:
+            self._name_index.add(name)
+        self.data[name] = record
+        record._book = self
+        self._index_record(record)
+        self._log(
+            "add_record", name,
+            phones=[phone.value for phone in record.phones],
+            birthday=record.birthday.value if record.birthday else None,
+        )
 
     def find(self, name):
         return self.data.get(name)
 
+    def iter_records(self, sort=None, offset=0, limit=None):
+        """
+        Перебирає записи книги у порядку додавання або, якщо sort="name", за іменем.
+        offset і limit задають сторінку: пропустити offset записів і віддати не більше limit.
+        """
+        if sort == "name":
+            records = (self.data[name] for name in self._name_index)
+        else:
+            records = iter(self.data.values())
+        stop = None if limit is None else offset + limit
+        return islice(records, offset, stop)
+
+    def find_by_phone(self, phone_number):
+        """Повертає відсортований список імен контактів, яким належить номер."""
+        return sorted(self._names_in(self._phone_index, phone_number))
+
+    def search(self, prefix, limit=None):
+        """
+        Шукає контакти, ім'я яких починається з prefix (без урахування регістру,
+        з нормалізацією Unicode). Працює за O(log N + k) по відсортованому індексу імен.
+        Повертає (не більше limit імен у порядку індексу, загальна кількість збігів).
+        """
+        key = normalize_name(prefix)
+        return self.names_with_prefix(prefix, limit), self._name_index.count_prefix(key)
+
+    def names_with_prefix(self, prefix, limit=None):
+        """Не більше limit імен, що починаються з prefix, у порядку індексу, без підрахунку решти."""
+        key = normalize_name(prefix)
+        return [name for _, name in islice(self._name_index.prefix(key), limit)]
+
+    @staticmethod
+    def _fuzzy_matches(key, candidates, limit):
+        """Відбирає з пар (нормалізоване ім'я, ім'я) ті, що відрізняються від key на 1–2 символи."""
+        max_distance = 1 if len(key) <= 4 else 2
+        matches = []
+        for candidate_key, name in candidates:
+            distance = _bounded_distance(key, candidate_key, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, candidate_key, name))
+        matches.sort()
+        return [name for _, _, name in matches[:limit]]
+
+    def search_fuzzy(self, term, limit=None):
+        """
+        Шукає контакти з іменами, схожими на term (відстань Дамерау–Левенштейна 1 для коротких
+        імен і 2 для довших). Щоб не перебирати всю книгу, розглядаються лише імена
+        з тією самою першою літерою — їх межі знаходяться по відсортованому індексу.
+        Повертає імена, найближчі спочатку.
+        """
+        key = normalize_name(term)
+        if not key:
+            return []
+        return self._fuzzy_matches(key, self._name_index.prefix(key[0]), limit)
+
+    def changes_since(self, since=0):
+        """
+        Повертає зміни книги з номерами, більшими за since, у порядку зростання номерів:
+        ітератор (номер, ім'я, запис або None, якщо запис видалено).
+        Стрічка змін упорядкована за номерами, тож її перебір з кінця зачіпає лише
+        нові зміни — O(змін), а не O(книги).
+        """
+        newer = []
+        for name in reversed(self._changed):
+            seq = self._changed[name]
+            if seq <= since:
+                break
+            newer.append((seq, name))
+        newer.reverse()
+        return ((seq, name, self.data.get(name)) for seq, name in newer)
+
     def delete(self, name):
         if name in self.data:
-            del self.data[name]
+            self._remember(name)
+            self._remember_order()
+            record = self.data.pop(name)
+            self._unindex_record(record)
+            self._name_index.remove(name)
+            record._book = None
+            self._log("delete", name)
         else:
             raise KeyError(f"Контакт з ім'ям '{name}' не знайдено.")
 
-    def get_upcoming_birthdays(self):
+    def _birthdays_on(self, day):
+        """Повертає імена іменинників на вказану дату (з урахуванням 29 лютого)."""
+        names = set(self._names_in(self._birthday_index, (day.month, day.day)))
+        # У невисокосний рік народжені 29 лютого святкують 28 лютого
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            names.update(self._names_in(self._birthday_index, (2, 29)))
+        return sorted(names)
+
+    def get_upcoming_birthdays(self, days=7):
         """
-        Повертає список користувачів, яких потрібно привітати по днях на наступному тижні.
+        Повертає список користувачів, яких потрібно привітати по днях протягом
+        наступних days днів (включно з сьогодні).
+        Дати повертаються у хронологічному порядку.
         """
         today = datetime.today().date()
         upcoming_birthdays = defaultdict(list)
         
-        for record in self.data.values():
-            if record.birthday is None:
+        # Переглядаємо лише дні вікна, а не всю книгу
+        for days_difference in range(days + 1):
+            congratulation_date = today + timedelta(days=days_difference)
+            names = self._birthdays_on(congratulation_date)
+            if not names:
                 continue
-            
-            bday_date = datetime.strptime(record.birthday.value, "%d.%m.%Y").date()
-            bday_this_year = bday_date.replace(year=today.year)
-            
-            if bday_this_year < today:
-                bday_this_year = bday_date.replace(year=today.year + 1)
-            
-            days_difference = (bday_this_year - today).days
-            
-            if 0 <= days_difference <= 7:
-                congratulation_date = bday_this_year
                 
-                # Переносимо привітання з вихідних на наступний понеділок
-                if congratulation_date.weekday() >= 5: # 5=Субота, 6=Неділя
-                    days_to_monday = 7 - congratulation_date.weekday()
-                    congratulation_date += timedelta(days=days_to_monday)
-                
-                date_key = congratulation_date.strftime("%d.%m.%Y")
-                upcoming_birthdays[date_key].append(record.name.value)
+            # Переносимо привітання з вихідних на наступний понеділок
+            if congratulation_date.weekday() >= 5: # 5=Субота, 6=Неділя
+                days_to_monday = 7 - congratulation_date.weekday()
+                congratulation_date += timedelta(days=days_to_monday)
+            
+            date_key = congratulation_date.strftime("%d.%m.%Y")
+            upcoming_birthdays[date_key].extend(names)
                 
         return upcoming_birthdays
 
     def save_to_file(self, filename):
-        """Зберігає об'єкт AddressBook у файл за допомогою pickle."""
-        with open(filename, "wb") as f:
-            pickle.dump(self, f)
+        """
+        Атомарно зберігає книгу у файл у двійковому форматі знімка (див. encode_book);
+        попередній знімок залишається у файлі .bak.
+        Якщо це файл, до якого підключений журнал, журнал після цього очищується.
+        """
+        with atomic_write(filename, backup=filename + ".bak") as f:
+            f.write(encode_book(self))
+        if filename == self._filename:
+            if self._journal is not None:
+                self._journal.truncate()
+            self._changes = 0
+
+    # Фонове збереження ділиться на три кроки: серіалізація (під час якої книга
+    # не повинна змінюватися), запис на диск (паралельно з командами) і очищення
+    # журналу від записів, що увійшли до знімка
+
+    def _take_snapshot(self):
+        """Повертає (серіалізована книга, позиція журналу на момент знімка, кількість змін у ньому)."""
+        offset = self._journal.position() if self._journal is not None else None
+        return encode_book(self), offset, self._changes
+
+    @staticmethod
+    def _write_snapshot(filename, data):
+        """Атомарно записує вже серіалізований знімок книги у filename."""
+        with atomic_write(filename, backup=filename + ".bak") as f:
+            f.write(data)
+
+    def _snapshot_written(self, offset, changes):
+        """Відрізає від журналу записи до offset, які вже є у збереженому знімку."""
+        if self._journal is not None and offset is not None:
+            self._journal.truncate(offset)
+        self._changes -= changes
 
     @classmethod
     def load_from_file(cls, filename):
-        """Завантажує об'єкт AddressBook з файлу."""
+        """
+        Завантажує об'єкт AddressBook з файлу та відтворює журнал змін,
+        зроблених після останнього знімка. Далі кожна зміна дописується в журнал.
+        Файл у старому форматі pickle одразу переписується у двійковому форматі
+        (сам pickle лишається у .bak).
+        """
+        backup = filename + ".bak"
+        strict = True
+        legacy = False
         try:
-            with open(filename, "rb") as f:
-                return pickle.load(f)
+            book, legacy = cls._read_snapshot(filename)
         except FileNotFoundError:
-            return cls()
-        except Exception:
-            return cls()
+            # Збій між перейменуваннями в atomic_write: знімок лишився тільки в .bak
+            book, legacy = cls._read_snapshot(backup) if os.path.exists(backup) else (cls(), False)
+        except Exception as e:
+            # Пошкоджений знімок не можна мовчки замінити порожньою книгою:
+            # відкладаємо його і беремо останній вдалий знімок
+            try:
+                book, legacy = cls._read_snapshot(backup)
+            except Exception:
+                # Файл лишається на місці: бот не запуститься з порожньою книгою поверх нього
+                raise UserError(
+                    f"Файл {filename} пошкоджено ({e!r}), а резервного знімка {backup} немає "
+                    f"або він теж пошкоджений."
+                ) from e
+            corrupt = filename + ".corrupt"
+            os.replace(filename, corrupt)
+            sys.stderr.write(
+                f"УВАГА: файл {filename} пошкоджено ({e!r}); його збережено як {corrupt}, "
+                f"книгу відновлено з {backup}.\n"
+            )
+            strict = False
+        if type(book) is not cls:
+            book = cls._adopt(book)
+        book._attach_journal(filename, strict)
+        if legacy:
+            book.save()
+        return book
 
-# --- Функции-Обработчики ---
+    def _attach_journal(self, filename, strict=True):
+        """Відтворює журнал файлу filename і далі дописує в нього кожну зміну книги."""
+        journal = Journal(filename + ".journal")
+        skipped = journal.replay(self, strict)
+        if skipped:
+            sys.stderr.write(f"УВАГА: {skipped} записів журналу не вдалося застосувати до {filename}.bak.\n")
+        self._journal = journal
+        self._filename = filename
 
-@input_error
-def add_contact(args, book: AddressBook):
+    @classmethod
+    def _read_snapshot(cls, filename):
+        """Читає знімок книги. Повертає (книга, True, якщо файл у старому форматі pickle)."""
+        with open(filename, "rb") as f:
+            data = f.read()
+        if data.startswith(BOOK_MAGIC):
+            return decode_book(data, cls), False
+        return _BookUnpickler(io.BytesIO(data)).load(), True
+
+    @classmethod
+    def _adopt(cls, book):
+        """Переносить записи та індекси книги іншого класу (наприклад, зі знімка) у нову книгу класу cls."""
+        adopted = cls()
+        adopted.data = book.data
+        adopted._phone_index = book._phone_index
+        adopted._birthday_index = book._birthday_index
+        adopted._name_index = book._name_index
+        adopted._journal_seq = book._journal_seq
+        adopted._changed = book._changed
+        adopted._sequence = book._sequence
+        for record in adopted.data.values():
+            record._book = adopted
+        return adopted
+
+    def save(self):
+        """Зберігає книгу у файл, з якого її було завантажено (якщо такий є)."""
+        if self._filename is not None:
+            self.save_to_file(self._filename)
+
+    def has_unsaved_changes(self):
+        """Чи є зміни, яких ще немає у знімку (у журналі або лише в пам'яті)."""
+        return self._changes != 0
+
+    @contextmanager
+    def deferred_writes(self):
+        """
+        Тимчасово припиняє записувати кожну зміну окремо (в журнал).
+        Зміни зберігаються лише явним викликом save_to_file.
+        """
+        journal, self._journal = self._journal, None
+        try:
+            yield
+        finally:
+            self._journal = journal
+
+    @contextmanager
+    def transaction(self):
+        """
+        Виконує зміни блоку як одну транзакцію: усі вони потрапляють у журнал одним записом
+        після успішного завершення блоку, а виключення скасовує їх усі за журналом скасування
+        (станом кожного зміненого запису до транзакції).
+        """
+        self._undo, self._pending = {}, []
+        try:
+            yield
+        except BaseException:
+            self._rollback()
+            raise
+        undo, pending = self._undo, self._pending
+        self._undo = self._undo_order = self._pending = None
+        for name in undo:
+            self._mark_changed(name)
+        if pending:
+            self._append_journal({"op": "batch", "name": None, "changes": pending})
+
+    def _rollback(self):
+        """Повертає записи, змінені в транзакції, до їхнього стану на її початку."""
+        undo, order = self._undo, self._undo_order
+        self._undo = self._undo_order = None
+        # Скасування не журналюється (у журналі ще немає нічого з транзакції)
+        # і не потрапляє у стрічку змін, поки _pending не скинуто
+        journal, self._journal = self._journal, None
+        try:
+            for name, state in undo.items():
+                record = self.data.get(name)
+                if state is None:
+                    if record is not None:
+                        self.delete(name)
+                elif record is None:
+                    self.add_record(Record._restore(name, *state))
+                else:
+                    restored = Record._restore(name, *state)
+                    self._begin_change(record)
+                    record.phones, record._phone_map = restored.phones, restored._phone_map
+                    record.birthday = restored.birthday
+                    self._end_change(record)
+            if order is not None:
+                # Видалені й відновлені записи повертаються на свої місця
+                self.data = {name: self.data[name] for name in order if name in self.data}
+            self._version += 1
+        finally:
+            self._journal = journal
+            self._pending = None
+
+    def close(self):
+        """Закриває журнал. Усі зміни вже записані в нього, тож повний знімок не потрібен."""
+        if self._journal is not None:
+            self._journal.close()
+
+class SQLiteAddressBook(AddressBook):
     """
-    Додає новий контакт або телефон до існуючого контакту.
-    Очікує: [ім'я] [телефон].
+    Адресна книга, що зберігає записи в базі SQLite.
+    Записи завантажуються в пам'ять лише тоді, коли команда звертається до них
+    (self.data — це кеш уже завантажених записів, не більше cache_size, з витісненням
+    найдавніше використаних), а пошук за телефоном і днями народження виконується
+    через індекси бази. Кожна зміна одразу записується в базу, тож журнал і знімки не потрібні.
     """
-    name, phone, *_ = args 
-    record = book.find(name)
-    message = Fore.GREEN + "Контакт оновлено." + Style.RESET_ALL
-    
-    if record is None:
-        record = Record(name)
-        book.add_record(record)
-        message = Fore.GREEN + "Контакт додано." + Style.RESET_ALL
-    
-    record.add_phone(phone)
-    
-    return message
 
-@input_error
-def change_contact(args, book: AddressBook):
-    """
-    Змінює номер телефону існуючого контакту.
-    Очікує 3 аргументи: [ім’я] [старий номер] [новий номер].
+    # Скільки записів тримається в пам'яті; решта читається з бази за потреби
+    cache_size = 1024
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            name TEXT PRIMARY KEY,
+            birthday INTEGER,     -- date.toordinal()
+            birthday_md INTEGER,  -- місяць * 100 + день, для пошуку іменинників
+            name_key TEXT,        -- normalize_name(name), для пошуку за префіксом
+            seq INTEGER           -- номер останньої зміни контакту (стрічка змін)
+        );
+        CREATE INDEX IF NOT EXISTS contacts_birthday_md ON contacts (birthday_md);
+        CREATE TABLE IF NOT EXISTS tombstones (
+            name TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL  -- номер зміни, якою контакт видалено
+        );
+        CREATE INDEX IF NOT EXISTS tombstones_seq ON tombstones (seq);
+        CREATE TABLE IF NOT EXISTS phones (
+            name TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            number TEXT NOT NULL,
+            PRIMARY KEY (name, position)
+        );
+        CREATE INDEX IF NOT EXISTS phones_number ON phones (number);
     """
-    name, old_phone, new_phone = args
-    
-    record = book.find(name)
-    if record is None:
-        raise KeyError 
-    
-    record.edit_phone(old_phone, new_phone)
-    return Fore.GREEN + f"Телефон {old_phone} для контакту {name} оновлено на {new_phone}." + Style.RESET_ALL
 
-@input_error
+    def __init__(self, filename):
+        super().__init__()
+        self.data = OrderedDict()
+        self._filename = filename
+        # False — зміни накопичуються в транзакції до виклику save_to_file
+        self.autocommit = True
+        import sqlite3
+        # Книгу можна відкрити у фоновому потоці (--background-load), а працювати з нею
+        # в основному. З'єднанням потоки користуються по черзі: основний потік чекає
+        # на завершення фонового (_Opening.result), перш ніж звернутися до книги
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(self.SCHEMA)
+        self._upgrade_schema()
+        self._sequence = ChangeSequence(self._last_seq())
+
+    def _upgrade_schema(self):
+        """Додає до баз, створених попередніми версіями, колонки та індекси для пошуку за іменем і стрічки змін."""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(contacts)")]
+        if "name_key" not in columns:
+            self._conn.create_function("normalize_name", 1, normalize_name, deterministic=True)
+            with self._conn:
+                self._conn.execute("ALTER TABLE contacts ADD COLUMN name_key TEXT")
+                self._conn.execute("UPDATE contacts SET name_key = normalize_name(name)")
+        if "seq" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE contacts ADD COLUMN seq INTEGER")
+                # Наявні контакти вважаються зміненими один раз, у порядку додавання
+                self._conn.execute("UPDATE contacts SET seq = rowid")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS contacts_name_key ON contacts (name_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS contacts_seq ON contacts (seq)")
+
+    def _last_seq(self):
+        """Найбільший номер зміни серед контактів і видалених контактів."""
+        return self._conn.execute(
+            "SELECT max(coalesce((SELECT max(seq) FROM contacts), 0), "
+            "coalesce((SELECT max(seq) FROM tombstones), 0))"
+        ).fetchone()[0]
+
+    def __getstate__(self):
+        raise TypeError("SQLiteAddressBook зберігається в базі, а не через pickle.")
+
+    @staticmethod
+    def _birthday_columns(record):
+        if record.birthday is None:
+            return None, None
+        day = record.birthday.date
+        return record.birthday.ordinal, day.month * 100 + day.day
+
+    def _store(self, record):
+        """Записує запис у базу повністю: рядок контакту і всі його телефони."""
+        name = record.name.value
+        self._conn.execute(
+            "INSERT INTO contacts (name, birthday, birthday_md, name_key, seq) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "birthday = excluded.birthday, birthday_md = excluded.birthday_md, seq = excluded.seq",
+            (name, *self._birthday_columns(record), normalize_name(name), self._sequence.next()),
+        )
+        self._conn.execute("DELETE FROM phones WHERE name = ?", (name,))
+        self._conn.executemany(
+            "INSERT INTO phones (name, position, number) VALUES (?, ?, ?)",
+            ((name, position, phone.value) for position, phone in enumerate(record.phones)),
+        )
+        self._commit()
+
+    def _commit(self):
+        if self.autocommit:
+            self._conn.commit()
+
+    # Індекси в пам'яті не потрібні: їх роль виконують індекси бази
+    def _begin_change(self, record):
+        pass
+
+    def _end_change(self, record):
+        pass
+
+    def _record_changed(self, record, op, args):
+        self._version += 1
+        self._store(record)
+
+    def _cache(self, name, record):
+        """Кладе запис у кеш як найнещодавніше використаний і витісняє зайві."""
+        record._book = self
+        self.data[name] = record
+        self.data.move_to_end(name)
+        while len(self.data) > self.cache_size:
+            # Витіснений запис уже збережено в базі; далі його зміни не стосуються книги
+            _, evicted = self.data.popitem(last=False)
+            evicted._book = None
+
+    def add_record(self, record):
+        name = record.name.value
+        old_record = self.data.get(name)
+        if old_record is not None and old_record is not record:
+            old_record._book = None
+        self._cache(name, record)
+        self._version += 1
+        self._conn.execute("DELETE FROM tombstones WHERE name = ?", (name,))
+        self._store(record)
+
+    def find(self, name):
+        record = self.data.get(name)
+        if record is not None:
+            self.data.move_to_end(name)
+            return record
+        row = self._conn.execute(
+            "SELECT birthday FROM contacts WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        numbers = [number for (number,) in self._conn.execute(
+            "SELECT number FROM phones WHERE name = ? ORDER BY position", (name,)
+        )]
+        record = Record._restore(name, numbers, row[0], repeated=True)
+        self._cache(name, record)
+        return record
+
+    def delete(self, name):
+        cursor = self._conn.execute("DELETE FROM contacts WHERE name = ?", (name,))
+        if cursor.rowcount == 0:
+            raise KeyError(f"Контакт з ім'ям '{name}' не знайдено.")
+        seq = self._sequence.next()
+        self._conn.execute("INSERT OR REPLACE INTO tombstones (name, seq) VALUES (?, ?)", (name, seq))
+        # Надгробки поза вікном FEED_RETENTION більше не потрібні (вибірка за індексом seq)
+        self._conn.execute("DELETE FROM tombstones WHERE seq <= ?", (seq - FEED_RETENTION,))
+        self._version += 1
+        self._commit()
+        record = self.data.pop(name, None)
+        if record is not None:
+            record._book = None
+
+    def iter_records(self, sort=None, offset=0, limit=None):
+        """
+        Потоково читає записи з бази у порядку додавання або, якщо sort="name", за іменем.
+        Сторінка (offset, limit) вибирається самою базою.
+        Записи не потрапляють у кеш, тож пам'ять не залежить від розміру книги.
+        """
+        order = "name_key, name" if sort == "name" else "rowid"
+        rows = self._conn.execute(
+            "SELECT c.name, c.birthday, p.number FROM "
+            f"(SELECT rowid, name, birthday, name_key FROM contacts ORDER BY {order} LIMIT ? OFFSET ?) AS c "
+            "LEFT JOIN phones AS p ON p.name = c.name "
+            f"ORDER BY {', '.join('c.' + column for column in order.split(', '))}, p.position",
+            (-1 if limit is None else limit, offset),
+        )
+        for (name, ordinal), group in groupby(rows, key=lambda row: row[:2]):
+            numbers = [number for _, _, number in group if number is not None]
+            yield Record._restore(name, numbers, ordinal, repeated=True)
+
+    def changes_since(self, since=0):
+        """Зміни з номерами, більшими за since: контакти і видалені контакти вибираються за індексами seq."""
+        rows = self._conn.execute(
+            "SELECT c.seq, c.name, c.birthday, p.number FROM contacts AS c "
+            "LEFT JOIN phones AS p ON p.name = c.name "
+            "WHERE c.seq > ? ORDER BY c.seq, p.position",
+            (since,),
+        )
+        changed = (
+            (seq, name, Record._restore(name, [number for *_, number in group if number is not None], ordinal))
+            for (seq, name, ordinal), group in groupby(rows, key=lambda row: row[:3])
+        )
+        deleted = (
+            (seq, name, None) for seq, name in self._conn.execute(
+                "SELECT seq, name FROM tombstones WHERE seq > ? ORDER BY seq", (since,)
+            )
+        )
+        return heapq.merge(changed, deleted, key=itemgetter(0))
+
+    def find_by_phone(self, phone_number):
+        """Повертає відсортований список імен контактів, яким належить номер."""
+        return [name for (name,) in self._conn.execute(
+            "SELECT DISTINCT name FROM phones WHERE number = ? ORDER BY name", (phone_number,)
+        )]
+
+    def search(self, prefix, limit=None):
+        """Пошук за початком імені через індекс колонки name_key."""
+        key = normalize_name(prefix)
+        bounds = (key, key + _MAX_CHAR)
+        total = self._conn.execute(
+            "SELECT COUNT(*) FROM contacts WHERE name_key >= ? AND name_key < ?", bounds
+        ).fetchone()[0]
+        return self.names_with_prefix(prefix, limit), total
+
+    def names_with_prefix(self, prefix, limit=None):
+        key = normalize_name(prefix)
+        return [name for (name,) in self._conn.execute(
+            "SELECT name FROM contacts WHERE name_key >= ? AND name_key < ? "
+            "ORDER BY name_key LIMIT ?", (key, key + _MAX_CHAR, -1 if limit is None else limit)
+        )]
+
+    def search_fuzzy(self, term, limit=None):
+        """Пошук схожих імен серед тих, що мають ту саму першу літеру."""
+        key = normalize_name(term)
+        if not key:
+            return []
+        max_distance = 2
+        candidates = self._conn.execute(
+            "SELECT name_key, name FROM contacts WHERE name_key >= ? AND name_key < ? "
+            "AND length(name_key) BETWEEN ? AND ?",
+            (key[0], key[0] + _MAX_CHAR, len(key) - max_distance, len(key) + max_distance),
+        )
+        return self._fuzzy_matches(key, candidates, limit)
+
+    def _birthdays_on(self, day):
+        """Повертає імена іменинників на вказану дату (з урахуванням 29 лютого)."""
+        keys = [day.month * 100 + day.day]
+        # У невисокосний рік народжені 29 лютого святкують 28 лютого
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            keys.append(229)
+        placeholders = ", ".join("?" * len(keys))
+        return [name for (name,) in self._conn.execute(
+            f"SELECT name FROM contacts WHERE birthday_md IN ({placeholders}) ORDER BY name", keys
+        )]
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __iter__(self):
+        return (name for (name,) in self._conn.execute("SELECT name FROM contacts ORDER BY rowid"))
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def __getitem__(self, name):
+        record = self.find(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def has_unsaved_changes(self):
+        """Чи є незафіксовані зміни (поза deferred_writes кожна зміна фіксується одразу)."""
+        return self._conn.in_transaction
+
+    def save_to_file(self, filename=None):
+        """
+        Фіксує незбережені зміни. Якщо вказано інший файл,
+        додатково копіює в нього всю базу.
+        """
+        self._conn.commit()
+        if filename is not None and filename != self._filename:
+            import sqlite3
+            with sqlite3.connect(filename) as target:
+                self._conn.backup(target)
+            target.close()
+
+    @classmethod
+    def load_from_file(cls, filename):
+        """Відкриває (або створює) базу. Самі записи завантажуються пізніше, за потреби."""
+        return cls(filename)
+
+    @classmethod
+    def migrate_from_pickle(cls, pickle_filename, filename):
+        """Одноразово переносить книгу з файлу (знімок разом з журналом) у базу SQLite."""
+        source = AddressBook.load_from_file(pickle_filename)
+        book = cls(filename)
+        with book._conn:
+            for record in source.iter_records():
+                ordinal, birthday_md = cls._birthday_columns(record)
+                name = record.name.value
+                book._conn.execute(
+                    "INSERT OR REPLACE INTO contacts (name, birthday, birthday_md, name_key, seq) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (name, ordinal, birthday_md, normalize_name(name), source._changed[name]),
+                )
+                book._conn.executemany(
+                    "INSERT INTO phones (name, position, number) VALUES (?, ?, ?)",
+                    ((name, position, phone.value) for position, phone in enumerate(record.phones)),
+                )
+            # Стрічка змін переноситься повністю, тож курсори синхронізації лишаються дійсними
+            book._conn.executemany(
+                "INSERT OR REPLACE INTO tombstones (name, seq) VALUES (?, ?)",
+                ((name, seq) for name, seq in source._changed.items() if name not in source.data),
+            )
+        book._sequence.value = source._sequence.value
+        source.close()
+        return book
+
+    @contextmanager
+    def deferred_writes(self):
+        """Накопичує зміни в одній транзакції, яку фіксує save_to_file."""
+        autocommit, self.autocommit = self.autocommit, False
+        try:
+            yield
+        finally:
+            self.autocommit = autocommit
+
+    @contextmanager
+    def transaction(self):
+        """
+        Транзакція засобами бази: зміни блоку робляться після точки збереження
+        і фіксуються разом, а виключення відкочує базу до неї.
+        """
+        last_seq = self._sequence.value
+        with self.deferred_writes():
+            self._conn.execute("SAVEPOINT batch")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK TO batch")
+                self._conn.execute("RELEASE batch")
+                self._sequence.value = last_seq
+                # Записи в кеші могли змінитися — далі вони знову читаються з бази
+                for record in self.data.values():
+                    record._book = None
+                self.data.clear()
+                self._version += 1
+                raise
+            self._conn.execute("RELEASE batch")
+        self._commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+# --- Багатопотоковий доступ ---
+
+class RWLock:
+    """
+    Блокування «багато читачів або один письменник».
+    Письменник має пріоритет: поки він чекає, нові читачі не входять, тож потік
+    читань не відкладає зміни безкінечно. Обидва режими повторно входять у тому ж потоці,
+    а письменник може ще й читати. Підвищення читання до запису не підтримується.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        # Ідентифікатор потоку-письменника і глибина його вкладених входів
+        self._writer = None
+        self._writer_depth = 0
+        # Глибина вкладених читань у кожному потоці
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            try:
+                yield
+            finally:
+                self._writer_depth -= 1
+            return
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+class ConcurrentAddressBook(AddressBook):
+    """
+    Адресна книга для спільного використання кількома потоками.
+    Зміни (додавання, видалення, зміни записів, журнал) виконуються під блокуванням запису,
+    пошук — під блокуванням читання, тож читачі не заважають одне одному.
+    Довгі перебори (all, експорт) йдуть по незмінному кортежу записів: він будується
+    один раз після зміни складу книги і не тримає блокування під час виводу.
+    """
+    def __init__(self, *args, **kwargs):
+        self._lock = RWLock()
+        # Одне збереження знімка за раз (явне або AutoSaver): інакше обидва писали б
+        # той самий .tmp, а застаріла позиція журналу відрізала б від нього нові записи
+        self._save_lock = threading.Lock()
+        # Знімки складу книги для iter_records: у порядку додавання та за іменем
+        self._records_snapshot = None
+        self._sorted_snapshot = None
+        super().__init__(*args, **kwargs)
+
+    def __setstate__(self, state):
+        self._lock = RWLock()
+        self._save_lock = threading.Lock()
+        self._records_snapshot = None
+        self._sorted_snapshot = None
+        super().__setstate__(state)
+
+    def _write_locked(self):
+        return self._lock.write()
+
+    def _invalidate_snapshots(self):
+        self._records_snapshot = None
+        self._sorted_snapshot = None
+
+    def add_record(self, record):
+        with self._lock.write():
+            super().add_record(record)
+            self._invalidate_snapshots()
+
+    def delete(self, name):
+        with self._lock.write():
+            super().delete(name)
+            self._invalidate_snapshots()
+
+    def iter_records(self, sort=None, offset=0, limit=None):
+        with self._lock.read():
+            if sort == "name":
+                if self._sorted_snapshot is None:
+                    self._sorted_snapshot = tuple(self.data[name] for name in self._name_index)
+                records = self._sorted_snapshot
+            else:
+                if self._records_snapshot is None:
+                    self._records_snapshot = tuple(self.data.values())
+                records = self._records_snapshot
+        stop = None if limit is None else offset + limit
+        return islice(records, offset, stop)
+
+    def find_by_phone(self, phone_number):
+        with self._lock.read():
+            return super().find_by_phone(phone_number)
+
+    def search(self, prefix, limit=None):
+        with self._lock.read():
+            return super().search(prefix, limit)
+
+    def names_with_prefix(self, prefix, limit=None):
+        with self._lock.read():
+            return super().names_with_prefix(prefix, limit)
+
+    def search_fuzzy(self, term, limit=None):
+        with self._lock.read():
+            return super().search_fuzzy(term, limit)
+
+    def get_upcoming_birthdays(self, days=7):
+        with self._lock.read():
+            return super().get_upcoming_birthdays(days)
+
+    def changes_since(self, since=0):
+        with self._lock.read():
+            return super().changes_since(since)
+
+    def save_to_file(self, filename):
+        # Читання достатньо: поки воно триває, жоден письменник не допише журнал
+        with self._save_lock, self._lock.read():
+            super().save_to_file(filename)
+
+    def _compact(self):
+        if self._compactor is not None:
+            super()._compact()
+            return
+        # Тут уже тримається блокування запису, а збереження бере _save_lock раніше
+        # за блокування книги, тож чекати на _save_lock не можна: інше збереження чекає,
+        # поки цей запис відпустить книгу. Воно й так скине журнал, а якщо ні,
+        # наступний запис спробує ще раз
+        if not self._save_lock.acquire(blocking=False):
+            return
+        try:
+            AddressBook.save_to_file(self, self._filename)
+        finally:
+            self._save_lock.release()
+
+    def _take_snapshot(self):
+        with self._lock.read():
+            return super()._take_snapshot()
+
+    def _snapshot_written(self, offset, changes):
+        with self._lock.write():
+            super()._snapshot_written(offset, changes)
+
+    @contextmanager
+    def deferred_writes(self):
+        with self._lock.write():
+            journal, self._journal = self._journal, None
+        try:
+            yield
+        finally:
+            with self._lock.write():
+                self._journal = journal
+
+    @contextmanager
+    def transaction(self):
+        # Блокування запису на весь блок: ні читачі, ні фонове збереження не бачать половини змін
+        with self._lock.write():
+            try:
+                with super().transaction():
+                    yield
+            finally:
+                self._invalidate_snapshots()
+
+    def close(self):
+        with self._lock.write():
+            super().close()
+
+class AutoSaver:
+    """
+    Фоновий потік, що зберігає знімок книги, коли з останнього знімка накопичилось
+    max_changes змін або минуло interval секунд і були зміни.
+    Книга серіалізується під блокуванням читання, а пишеться на диск уже без нього,
+    тож команди чекають лише на серіалізацію. Книга має бути потокобезпечною
+    (ConcurrentAddressBook).
+    """
+    # Як часто потік перевіряє лічильник змін, секунд
+    poll_interval = 0.5
+
+    def __init__(self, book, interval=60, max_changes=500, log=None):
+        self.book = book
+        self.interval = interval
+        self.max_changes = max_changes
+        self.log = log or sys.stderr
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+
+    def start(self):
+        # Журнал, що виріс, теж зберігається цим потоком, а не командою, яка його доповнила
+        self.book._compactor = self
+        self._thread.start()
+        return self
+
+    def __call__(self, book):
+        self._wake.set()
+
+    def _run(self):
+        last_save = time.monotonic()
+        while not self._stopping:
+            woken = self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stopping:
+                break
+            changes = self.book._changes
+            if not changes:
+                continue
+            if woken or changes >= self.max_changes or time.monotonic() - last_save >= self.interval:
+                self.save()
+                last_save = time.monotonic()
+
+    def save(self):
+        """Зберігає знімок. Помилка запису не зупиняє потік: зміни лишаються в журналі."""
+        try:
+            with self.book._save_lock:
+                data, offset, changes = self.book._take_snapshot()
+                self.book._write_snapshot(self.book._filename, data)
+                self.book._snapshot_written(offset, changes)
+        except Exception as e:
+            self.log.write(f"Автозбереження не вдалося: {e!r}\n")
+
+    def stop(self):
+        """Зупиняє потік і зберігає зміни, яких ще немає у знімку."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.book._compactor = None
+        if self.book._changes:
+            self.book.save()
+
+# --- Розподілена книга ---
+
+def _shard_filename(filename, index, count):
+    return f"{filename}.{index + 1}-of-{count}"
+
+def _read_shard(filename):
+    """
+    Виконується в окремому процесі: читає і розбирає файл шарда.
+    Повертає колонки (див. decode_columns) або None, якщо файл треба завантажити звичайним
+    способом (його немає, він у старому форматі або пошкоджений — тоді діє відновлення з .bak).
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+        return decode_columns(data)
+    except (OSError, ValueError, struct.error):
+        return None
+
+class ShardedAddressBook:
+    """
+    Адресна книга, розділена за хешем імені (crc32) на count книг-шардів,
+    кожна зі своїм файлом і журналом. Шарди завантажуються паралельно в пулі процесів.
+    Команди з одним ім'ям звертаються лише до свого шарда, а перебори
+    (all, дні народження, пошук за телефоном і за іменем) опитують усі шарди
+    й об'єднують результати.
+    """
+    # Окремого журналу в розподіленої книги немає: кожен шард веде свій
+    _journal = None
+
+    # Менші за цей сумарний розмір шарди розбираються в цьому процесі:
+    # запуск пулу і передача колонок між процесами коштують більше, ніж сам розбір
+    parallel_min_bytes = 16 * 1024 * 1024
+
+    def __init__(self, shards):
+        self.shards = list(shards)
+        self._results = ResultCache()
+        # Спільний лічильник змін: номери змін різних шардів не перетинаються
+        self._sequence = ChangeSequence(max((shard._sequence.value for shard in self.shards), default=0))
+        for shard in self.shards:
+            shard._sequence = self._sequence
+
+    @property
+    def _version(self):
+        # Будь-яка зміна будь-якого шарда змінює й суму
+        return sum(shard._version for shard in self.shards)
+
+    def _shard(self, name):
+        return self.shards[zlib.crc32(name.encode("utf-8")) % len(self.shards)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def __contains__(self, name):
+        return name in self._shard(name)
+
+    def __iter__(self):
+        return chain.from_iterable(self.shards)
+
+    def find(self, name):
+        return self._shard(name).find(name)
+
+    def add_record(self, record):
+        self._shard(record.name.value).add_record(record)
+
+    def delete(self, name):
+        self._shard(name).delete(name)
+
+    def iter_records(self, sort=None, offset=0, limit=None):
+        """
+        Перебирає записи всіх шардів: шард за шардом (у кожному — в порядку додавання)
+        або, якщо sort="name", злиттям відсортованих індексів імен.
+        """
+        if sort == "name":
+            merged = heapq.merge(*(shard._name_index.prefix("") for shard in self.shards))
+            records = (self.find(name) for _, name in merged)
+        else:
+            records = chain.from_iterable(shard.iter_records() for shard in self.shards)
+        stop = None if limit is None else offset + limit
+        return islice(records, offset, stop)
+
+    def find_by_phone(self, phone_number):
+        return sorted(chain.from_iterable(shard.find_by_phone(phone_number) for shard in self.shards))
+
+    def search(self, prefix, limit=None):
+        key = normalize_name(prefix)
+        total = sum(shard._name_index.count_prefix(key) for shard in self.shards)
+        return self.names_with_prefix(prefix, limit), total
+
+    def names_with_prefix(self, prefix, limit=None):
+        key = normalize_name(prefix)
+        merged = heapq.merge(*(shard._name_index.prefix(key) for shard in self.shards))
+        return [name for _, name in islice(merged, limit)]
+
+    def search_fuzzy(self, term, limit=None):
+        key = normalize_name(term)
+        if not key:
+            return []
+        candidates = chain.from_iterable(shard._name_index.prefix(key[0]) for shard in self.shards)
+        return AddressBook._fuzzy_matches(key, candidates, limit)
+
+    def _birthdays_on(self, day):
+        return sorted(chain.from_iterable(shard._birthdays_on(day) for shard in self.shards))
+
+    def changes_since(self, since=0):
+        return heapq.merge(*(shard.changes_since(since) for shard in self.shards), key=itemgetter(0))
+
+    # Обхід вікна днів спільний зі звичайною книгою: він спирається лише на _birthdays_on
+    get_upcoming_birthdays = AddressBook.get_upcoming_birthdays
+
+    def save_to_file(self, filename):
+        for index, shard in enumerate(self.shards):
+            shard.save_to_file(_shard_filename(filename, index, len(self.shards)))
+
+    def save(self):
+        for shard in self.shards:
+            shard.save()
+
+    def has_unsaved_changes(self):
+        return any(shard.has_unsaved_changes() for shard in self.shards)
+
+    @contextmanager
+    def deferred_writes(self):
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.deferred_writes())
+            yield
+
+    @contextmanager
+    def transaction(self):
+        """Транзакція в кожному шарді; виключення скасовує зміни в усіх, а кожен шард журналює свій пакет."""
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.transaction())
+            yield
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    @classmethod
+    def load_from_file(cls, filename, count, workers=None):
+        """
+        Завантажує книгу з файлів filename.1-of-count ... filename.count-of-count.
+        Великі файли розбираються паралельно в workers процесах (за замовчуванням —
+        за кількістю ядер), а записи та індекси будуються в цьому процесі.
+        Якщо шардів ще немає, а є звичайний файл filename, книга один раз
+        розподіляється по шардах (сам файл перейменовується на filename.unsharded).
+        """
+        # Шард, що ще не зберігався, має лише журнал
+        pattern = re.compile(re.escape(filename) + r"\.\d+-of-(\d+)(\.journal)?$")
+        for path in glob.glob(glob.escape(filename) + ".*-of-*"):
+            match = pattern.match(path)
+            if match and int(match.group(1)) != count:
+                raise UserError(
+                    f"Файл {filename} розділено на {match.group(1)} шардів, а не на {count}."
+                )
+        paths = [_shard_filename(filename, index, count) for index in range(count)]
+        workers = min(workers or os.cpu_count() or 1, count)
+        total_bytes = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        if workers > 1 and total_bytes >= cls.parallel_min_bytes:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers) as pool:
+                decoded = list(pool.map(_read_shard, paths))
+        else:
+            decoded = [_read_shard(path) for path in paths]
+
+        shards = []
+        for path, columns in zip(paths, decoded):
+            if columns is None:
+                shard = AddressBook.load_from_file(path)
+            else:
+                shard = book_from_columns(AddressBook, *columns)
+                shard._attach_journal(path)
+            shards.append(shard)
+        book = cls(shards)
+
+        if not any(os.path.exists(path) for path in paths) and os.path.exists(filename):
+            book._split(filename)
+        return book
+
+    def _split(self, filename):
+        """Розподіляє записи звичайної книги з файлу filename по шардах."""
+        source = AddressBook.load_from_file(filename)
+        # Нумерація змін продовжується, а видалені імена переносяться в шарди,
+        # тож курсори синхронізації лишаються дійсними
+        self._sequence.value = max(self._sequence.value, source._sequence.value)
+        with self.deferred_writes():
+            for record in source.iter_records():
+                self.add_record(record)
+            for name in source._changed:
+                if name not in source.data:
+                    self._shard(name)._mark_changed(name)
+        source.close()
+        self.save()
+        for suffix in ("", ".journal"):
+            if os.path.exists(filename + suffix):
+                os.replace(filename + suffix, filename + ".unsharded" + suffix)
+
+# --- Імпорт та експорт ---
+
+# Скільки рядків файлу перевіряється за один раз під час імпорту
+IMPORT_BATCH_SIZE = 1000
+
+CSV_HEADER = ["name", "phones", "birthday"]
+
+def _contact_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".vcf", ".vcard"):
+        return "vcard"
+    raise UserError(f"Формат файлу {path} не підтримується. Використовуйте .csv або .vcf.")
+
+def _read_csv(f):
+    """Читає рядки CSV (name, phones через ';', birthday) як (номер рядка, ім'я, телефони, дата)."""
+    reader = csv.reader(f)
+    for row in reader:
+        if not row or row == CSV_HEADER:
+            continue
+        name, phones, birthday = (row + ["", "", ""])[:3]
+        numbers = [number.strip() for number in phones.split(";") if number.strip()]
+        yield reader.line_num, name.strip(), numbers, birthday.strip()
+
+def _unfold_vcard(f):
+    """Склеює перенесені рядки vCard (продовження починається з пробілу або табуляції)."""
+    line_number, current = 0, None
+    for number, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield line_number, current
+        line_number, current = number, line
+    if current is not None:
+        yield line_number, current
+
+def _vcard_escape(value):
+    """Екранує текстове значення vCard: «\\», «,», «;» та переведення рядка."""
+    return (value.replace("\\", "\\\\").replace(",", "\\,")
+            .replace(";", "\\;").replace("\n", "\\n"))
+
+def _vcard_unescape(value):
+    """Знімає екранування vCard, зворотне до _vcard_escape."""
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+def _read_vcard(f):
+    """Читає картки vCard (FN, TEL, BDAY) як (номер рядка, ім'я, телефони, дата)."""
+    card = None
+    for line_number, line in _unfold_vcard(f):
+        key, _, value = line.partition(":")
+        key = key.split(";", 1)[0].upper()
+        if key == "BEGIN":
+            card = [line_number, "", [], ""]
+        elif card is None:
+            continue
+        elif key == "FN":
+            card[1] = _vcard_unescape(value.strip())
+        elif key == "TEL":
+            card[2].append(value.strip())
+        elif key == "BDAY":
+            # vCard зберігає дату як YYYY-MM-DD або YYYYMMDD
+            digits = value.strip().replace("-", "")
+            card[3] = f"{digits[6:8]}.{digits[4:6]}.{digits[:4]}" if len(digits) == 8 else value.strip()
+        elif key == "END":
+            yield tuple(card)
+            card = None
+
+def _validate_batch(rows):
+    """
+    Перевіряє пачку рядків імпорту одним проходом, без виключень на кожен об'єкт.
+    Повертає коректні рядки як (ім'я, телефони, порядковий номер дати)
+    та відхилені як (номер рядка, ім'я, причина).
+    """
+    valid, rejected = [], []
+    for line_number, name, numbers, birthday in rows:
+        if not name:
+            rejected.append((line_number, name, "порожнє ім'я"))
+            continue
+        if any(ch.isspace() for ch in name):
+            # команди ділять рядок за пробілами, тож таке ім'я не знайти й не змінити
+            rejected.append((line_number, name, "ім'я містить пробіли"))
+            continue
+        bad_numbers = [number for number in numbers if not is_valid_phone(number)]
+        if bad_numbers:
+            rejected.append((line_number, name, f"некоректні номери: {'; '.join(bad_numbers)}"))
+            continue
+        ordinal = None
+        if birthday:
+            ordinal = parse_date_ordinal(birthday)
+            if ordinal is None:
+                rejected.append((line_number, name, f"некоректна дата: {birthday}"))
+                continue
+        valid.append((name, numbers, ordinal))
+    return valid, rejected
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_contacts(book, path):
+    """
+    Потоково імпортує контакти з файлу CSV або vCard.
+    Рядки перевіряються пачками; некоректні записуються у звіт <path>.rejects.csv.
+    Наявні контакти доповнюються новими номерами та датою народження.
+    Книга зберігається один раз наприкінці.
+    Повертає (кількість імпортованих, кількість відхилених, шлях до звіту або None).
+    """
+    reader = _read_csv if _contact_format(path) == "csv" else _read_vcard
+    if not os.path.exists(path):
+        raise UserError(f"Файл {path} не знайдено.")
+
+    imported = rejected_count = 0
+    rejects_path = path + ".rejects.csv"
+    rejects_file = rejects_writer = None
+
+    with open(path, encoding="utf-8", newline="") as f, book.deferred_writes():
+        try:
+            for batch in _batches(reader(f), IMPORT_BATCH_SIZE):
+                valid, rejected = _validate_batch(batch)
+                for name, numbers, ordinal in valid:
+                    record = book.find(name)
+                    if record is None:
+                        book.add_record(Record._restore(name, numbers, ordinal))
+                    else:
+                        for number in numbers:
+                            if record.find_phone(number) is None:
+                                record.add_phone(number)
+                        if ordinal is not None:
+                            record.add_birthday(Birthday.from_ordinal(ordinal).value)
+                imported += len(valid)
+                if rejected:
+                    if rejects_writer is None:
+                        rejects_file = open(rejects_path, "w", encoding="utf-8", newline="")
+                        rejects_writer = csv.writer(rejects_file)
+                        rejects_writer.writerow(["line", "name", "reason"])
+                    rejects_writer.writerows(rejected)
+                    rejected_count += len(rejected)
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+            book.save()
+
+    return imported, rejected_count, rejects_path if rejected_count else None
+
+def export_contacts(book, path):
+    """Потоково записує всі контакти книги у файл CSV або vCard. Повертає кількість контактів."""
+    fmt = _contact_format(path)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            for record in book.iter_records():
+                writer.writerow([
+                    record.name.value,
+                    ";".join(phone.value for phone in record.phones),
+                    record.birthday.value if record.birthday else "",
+                ])
+                count += 1
+        else:
+            for record in book.iter_records():
+                lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{_vcard_escape(record.name.value)}"]
+                lines.extend(f"TEL:{phone.value}" for phone in record.phones)
+                if record.birthday:
+                    lines.append(f"BDAY:{record.birthday.date.isoformat()}")
+                lines.append("END:VCARD")
+                f.write("\r\n".join(lines) + "\r\n")
+                count += 1
+    return count
+
+def change_entry(seq, name, record):
+    """Рядок стрічки змін для експорту: змінений контакт цілком або «надгробок» видаленого."""
+    if record is None:
+        return {"seq": seq, "op": "delete", "name": name}
+    return {
+        "seq": seq, "op": "upsert", "name": name,
+        "phones": [phone.value for phone in record.phones],
+        "birthday": record.birthday.value if record.birthday else None,
+    }
+
+def export_changes(book, path, since=0):
+    """
+    Потоково записує у файл JSON Lines зміни книги з номерами, більшими за since
+    (див. AddressBook.changes_since). Повертає (кількість змін, номер останньої
+    з них — курсор для наступного експорту; since, якщо змін немає).
+    """
+    count, last = 0, since
+    with open(path, "w", encoding="utf-8") as f:
+        for change in book.changes_since(since):
+            f.write(json.dumps(change_entry(*change), ensure_ascii=False) + "\n")
+            count += 1
+            last = change[0]
+    return count, last
+
+# --- Пошук дублікатів ---
+
+# Усе, крім літер і цифр; після розкладу NFKD сюди потрапляє й діакритика
+_NOT_ALNUM = re.compile(r"[\W_]+")
+
+def duplicate_key(name):
+    """
+    Ключ для пошуку майже однакових імен: без регістру, діакритики та символів,
+    що не є літерами чи цифрами (O'Neil, oneil і Óneil мають однаковий ключ).
+    """
+    return _NOT_ALNUM.sub("", unicodedata.normalize("NFKD", name)).casefold()
+
+def find_duplicates(book):
+    """
+    Шукає дублікати одним проходом по книзі з хеш-таблицями, тобто за O(N):
+    контакти з повторними номерами, номери, що належать кільком контактам,
+    та імена з однаковим duplicate_key.
+    Повертає (імена контактів з повторними номерами, {номер: імена}, [групи схожих імен]).
+    """
+    repeated = []
+    # Перший власник кожного номера і перше ім'я з кожним ключем;
+    # списки заводяться лише для тих, що повторюються
+    first_owner, shared = {}, {}
+    first_name, similar = {}, {}
+    for record in book.iter_records():
+        name = record.name.value
+        if len(record.phones) != len(record._phone_map):
+            repeated.append(name)
+        for number in record._phone_map:
+            owner = first_owner.setdefault(number, name)
+            if owner != name:
+                shared.setdefault(number, [owner]).append(name)
+        key = duplicate_key(name)
+        first = first_name.setdefault(key, name)
+        if first != name:
+            similar.setdefault(key, [first]).append(name)
+    return repeated, shared, list(similar.values())
+
+# --- Кілька книг ---
+
+# Книга, з якою починається сеанс, якщо не задано --book
+DEFAULT_BOOK = "address_book"
+
+_BOOK_NAME = re.compile(r"[\w-]+")
+
+def book_path(name, storage):
+    """Файл книги name у сховищі storage: <name>.bin або <name>.db."""
+    if not _BOOK_NAME.fullmatch(name):
+        raise UserError("Назва книги може містити лише літери, цифри, _ та -.")
+    if name == DEFAULT_BOOK:
+        return SQLITE_FILE_NAME if storage == "sqlite" else FILE_NAME
+    return f"{name}.db" if storage == "sqlite" else f"{name}.bin"
+
+def flush_and_close(book):
+    """
+    Зберігає книгу на диск, якщо в ній є незбережені зміни, і закриває її.
+    Без змін знімок не переписується: інакше він витіснив би з .bak попередній.
+    """
+    if book.has_unsaved_changes():
+        book.save()
+    book.close()
+
+class _Opening:
+    """Книга, що відкривається функцією opener у фоновому потоці."""
+    def __init__(self, opener, name, done=None):
+        self.book = self.error = None
+        self.elapsed = None
+        self._thread = threading.Thread(
+            target=self._run, args=(opener, name, done), name=f"open-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, opener, name, done):
+        start = time.perf_counter()
+        try:
+            self.book = opener(name)
+        except BaseException as e:
+            self.error = e
+        self.elapsed = time.perf_counter() - start
+        if done is not None:
+            done(name, self)
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def result(self):
+        """Дочікується відкриття і повертає книгу або піднімає виключення opener."""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.book
+
+class BookCache:
+    """
+    Відкриті книги за назвами, не більше capacity одночасно.
+    Книга відкривається функцією opener(назва) при першому зверненні або заздалегідь
+    у фоновому потоці (preload); коли відкритих книг стає більше за capacity,
+    найдавніше використана передається closer (за замовчуванням — зберегти й закрити)
+    і звільняє пам'ять.
+    """
+    def __init__(self, opener, capacity=8, closer=flush_and_close):
+        self.opener = opener
+        self.capacity = capacity
+        self.closer = closer
+        self._books = OrderedDict()
+        # Книги, що відкриваються у фоні: назва -> _Opening
+        self._opening = {}
+        # Під час deferred_writes: назва -> активний контекст deferred_writes книги
+        self._deferred = None
+
+    def preload(self, name, done=None):
+        """
+        Починає відкривати книгу name у фоновому потоці й одразу повертається;
+        get(name) дочекається завершення. done(name, opening) викликається
+        у фоновому потоці, щойно книгу відкрито (або не вдалося відкрити).
+        """
+        if name not in self:
+            self._opening[name] = _Opening(self.opener, name, done)
+
+    def ready(self, name):
+        """Чи відкрита книга name, тобто get(name) поверне її без очікування."""
+        return name in self._books
+
+    def get(self, name):
+        book = self._books.get(name)
+        if book is not None:
+            self._books.move_to_end(name)
+            return book
+        opening = self._opening.pop(name, None)
+        book = self.opener(name) if opening is None else opening.result()
+        self._books[name] = book
+        if self._deferred is not None:
+            self._defer(name, book)
+        while len(self._books) > self.capacity:
+            self._release(*self._books.popitem(last=False))
+        return book
+
+    def __contains__(self, name):
+        return name in self._books or name in self._opening
+
+    def __len__(self):
+        return len(self._books) + len(self._opening)
+
+    def names(self):
+        """Назви відкритих книг, від найдавніше до найнещодавніше використаної; далі — ті, що відкриваються."""
+        return [*self._books, *self._opening]
+
+    def _defer(self, name, book):
+        context = book.deferred_writes()
+        context.__enter__()
+        self._deferred[name] = context
+
+    def _release(self, name, book):
+        if self._deferred is not None and name in self._deferred:
+            self._deferred.pop(name).__exit__(None, None, None)
+        self.closer(book)
+
+    @contextmanager
+    def deferred_writes(self):
+        """Як AddressBook.deferred_writes, але для всіх книг, відкритих до і під час блоку."""
+        self._deferred = {}
+        for name, book in self._books.items():
+            self._defer(name, book)
+        try:
+            yield
+        finally:
+            deferred, self._deferred = self._deferred, None
+            for context in deferred.values():
+                context.__exit__(None, None, None)
+
+    def save_all(self):
+        for book in self._books.values():
+            if book.has_unsaved_changes():
+                book.save()
+
+    def close_all(self):
+        for name in list(self._opening):
+            try:
+                self.get(name)
+            except ValueError:
+                # Книгу так і не вдалося відкрити — зберігати нічого
+                pass
+        while self._books:
+            self._release(*self._books.popitem(last=False))
+
+class Session:
+    """Сеанс роботи з ботом (консоль, пакетний файл або клієнт сервера): поточна книга з кешу books."""
+    def __init__(self, books, name=DEFAULT_BOOK):
+        self.books = books
+        self.name = name
+        # Розпочата командою begin транзакція (Transaction) або None
+        self.transaction = None
+
+    @property
+    def book(self):
+        return self.books.get(self.name)
+
+    def use(self, name, wait=True, done=None):
+        """
+        Робить поточною книгу name, відкриваючи її за потреби. З wait=False книга
+        відкривається у фоновому потоці (done — як у BookCache.preload), і на неї
+        чекає лише перша команда, якій потрібні дані.
+        """
+        if not _BOOK_NAME.fullmatch(name):
+            raise UserError("Назва книги може містити лише літери, цифри, _ та -.")
+        if wait:
+            self.books.get(name)
+        else:
+            self.books.preload(name, done)
+        self.name = name
+
+# --- Реєстр команд ---
+
+class CommandStats:
+    """
+    Статистика виконання команд: кількість викликів і затримки.
+    Для перцентилів зберігаються лише останні max_samples вимірів кожної команди.
+    """
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._counts = defaultdict(int)
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+
+    def record(self, name, elapsed_ns):
+        self._counts[name] += 1
+        self._samples[name].append(elapsed_ns)
+
+    @staticmethod
+    def _percentile(ordered, percent):
+        # Метод найближчого рангу
+        return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+    def summary(self):
+        """Повертає {команда: {"count", "p50_ms", "p95_ms", "p99_ms"}}, відсортовано за назвою."""
+        result = {}
+        for name in sorted(self._counts):
+            ordered = sorted(self._samples[name])
+            result[name] = {"count": self._counts[name]}
+            for percent in (50, 95, 99):
+                result[name][f"p{percent}_ms"] = round(self._percentile(ordered, percent) / 1e6, 3)
+        return result
+
+    def reset(self):
+        self._counts.clear()
+        self._samples.clear()
+
+# Статистика всіх команд процесу
+STATS = CommandStats()
+
+def _timed_chunks(name, chunks, elapsed_ns):
+    """
+    Пропускає потокову відповідь, додаючи до elapsed_ns лише час,
+    витрачений обробником на кожну порцію (без часу виводу).
+    """
+    try:
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                elapsed_ns += time.perf_counter_ns() - start
+            yield chunk
+    finally:
+        STATS.record(name, elapsed_ns)
+
+def timed(name, handler):
+    """Обгортка, що вимірює час виконання обробника команди name і записує його в STATS."""
+    @wraps(handler)
+    def inner(args, book):
+        start = time.perf_counter_ns()
+        result = handler(args, book)
+        elapsed_ns = time.perf_counter_ns() - start
+        if isinstance(result, str):
+            STATS.record(name, elapsed_ns)
+            return result
+        return _timed_chunks(name, result, elapsed_ns)
+    return inner
+
+class Command:
+    """Команда бота: назва, псевдоніми, мінімальна кількість аргументів і обробник."""
+    def __init__(self, name, handler, aliases=(), arity=0, usage="", exits=False, session=False, mutates=False,
+                 needs_book=True, local_only=False, bulk=False):
+        self.name = name
+        self.aliases = aliases
+        self.arity = arity
+        self.usage = usage or name
+        # True для команд, що завершують роботу бота
+        self.exits = exits
+        # True для команд, що змінюють книгу: у транзакції вони накопичуються до commit
+        self.mutates = mutates
+        # True для команд, що змінюють книгу масово й поза транзакціями (import):
+        # під час транзакції вони недоступні
+        self.bulk = bulk
+        # True для команд, яким замість поточної книги передається весь сеанс (Session)
+        self.session = session
+        # False для команд, що не звертаються до книги: вони не чекають її завантаження
+        # і отримують None замість книги
+        self.needs_book = needs_book
+        # True (або функція від аргументів, що повертає True) для команд, які читають чи пишуть
+        # файли на машині бота: мережевим клієнтам сервер їх не виконує
+        self.local_only = local_only
+        self.handler = timed(name, handler)
+
+    def is_local_only(self, args):
+        return self.local_only(args) if callable(self.local_only) else self.local_only
+
+    def __call__(self, args, book):
+        if len(args) < self.arity:
+            return error_message(f"Введіть аргументи для команди: {self.usage}")
+        return self.handler(args, book)
+
+# Таблиця диспетчеризації: назва або псевдонім команди -> Command
+COMMANDS = {}
+
+def command(name, *aliases, arity=0, usage="", exits=False, session=False, mutates=False, needs_book=True,
+            local_only=False, bulk=False):
+    """
+    Декоратор, що реєструє обробник (args, book) у COMMANDS під назвою name
+    та псевдонімами aliases. Сама функція-обробник повертається без змін.
+    З session=True обробник отримує (args, session).
+    """
+    def register(handler):
+        entry = Command(
+            name, handler, aliases, arity, usage, exits, session, mutates, needs_book, local_only, bulk
+        )
+        for key in (name, *aliases):
+            COMMANDS[key] = entry
+        return handler
+    return register
+
+class CommandProfiler:
+    """
+    Профілювання команд для пошуку причин повільної роботи.
+    З profile=True кожен виклик команди профілюється cProfile, і профіль записується
+    у файл <каталог>/<номер>-<команда>.prof (відкривається pstats, snakeviz тощо).
+    З slow_ms для команд, що виконувались довше slow_ms мілісекунд, записується знімок
+    розподілу пам'яті tracemalloc (<номер>-<команда>.tracemalloc, відкривається
+    tracemalloc.Snapshot.load) і текстовий звіт з найбільшими місцями виділення.
+    Обгортки встановлюються лише під час запуску з відповідними параметрами,
+    тож без них команди виконуються без жодних додаткових витрат.
+    """
+    # Скільки рядків коду з найбільшим обсягом виділеної пам'яті потрапляє у звіт
+    report_lines = 25
+
+    def __init__(self, directory, profile=False, slow_ms=None):
+        self.directory = directory
+        self.profile = profile
+        self.slow_ms = slow_ms
+        self._calls = 0
+        os.makedirs(directory, exist_ok=True)
+        if slow_ms is not None:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def install(self, commands):
+        """Обгортає обробники всіх команд з таблиці commands."""
+        for entry in set(commands.values()):
+            entry.handler = self.wrap(entry.name, entry.handler)
+
+    def wrap(self, name, handler):
+        import cProfile
+        import tracemalloc
+
+        @wraps(handler)
+        def inner(args, book):
+            self._calls += 1
+            prefix = os.path.join(self.directory, f"{self._calls:05d}-{name}")
+            profiler = cProfile.Profile() if self.profile else None
+            if self.slow_ms is not None:
+                tracemalloc.reset_peak()
+            start = time.perf_counter_ns()
+            if profiler is not None:
+                profiler.enable()
+            try:
+                result = handler(args, book)
+                # Потокова відповідь дочитується тут, щоб її робота потрапила до профілю
+                if not isinstance(result, str):
+                    result = iter(tuple(result))
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+            if profiler is not None:
+                profiler.dump_stats(prefix + ".prof")
+            if self.slow_ms is not None and elapsed_ms >= self.slow_ms:
+                self._dump_allocations(prefix, name, elapsed_ms)
+            return result
+        return inner
+
+    def _dump_allocations(self, prefix, name, elapsed_ms):
+        import cProfile
+        import tracemalloc
+        # Виділення самих cProfile і tracemalloc до звіту не належать
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+        snapshot.dump(prefix + ".tracemalloc")
+        current, peak = tracemalloc.get_traced_memory()
+        with open(prefix + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"Команда: {name}\n")
+            f.write(f"Час: {elapsed_ms:.1f} мс (поріг {self.slow_ms} мс)\n")
+            f.write(f"Пам'ять: {current / 2**20:.1f} MiB, пік під час команди {peak / 2**20:.1f} MiB\n\n")
+            for stat in snapshot.statistics("lineno")[:self.report_lines]:
+                f.write(f"{stat}\n")
+
+# --- Транзакції ---
+
+class _Rollback(Exception):
+    """Перериває транзакцію книги, щоб скасувати вже застосовані в ній зміни."""
+
+def check_change(command, args):
+    """
+    Перевіряє команду зміни, не звертаючись до книги: чи вона змінює книгу, чи вистачає
+    аргументів, чи коректні номери телефонів і дати. Повертає текст помилки або None.
+    """
+    entry = COMMANDS.get(command)
+    if entry is None:
+        return "Невідома команда."
+    if entry.bulk:
+        return f"Команда {command} не може бути частиною транзакції."
+    if not entry.mutates:
+        return f"Команда {command} не змінює книгу і не може бути частиною транзакції."
+    if len(args) < entry.arity:
+        return f"Введіть аргументи для команди: {entry.usage}"
+    phone = {"add": 1, "change": 2}.get(entry.name)
+    if phone is not None and not is_valid_phone(args[phone]):
+        return "Номер телефону повинен містити 10 цифр."
+    if entry.name == "add-birthday" and parse_date_ordinal(args[1]) is None:
+        return "Invalid date format. Use DD.MM.YYYY"
+    return None
+
+def apply_changes(book, changes):
+    """
+    Застосовує до книги команди змін [(мітка, команда, аргументи), ...] в одній транзакції
+    книги (у журнал вони потрапляють одним записом): або всі, або жодної.
+    Повертає None або (мітка, повідомлення) для першої команди, що не виконалася.
+    """
+    failure = None
+    try:
+        with book.transaction():
+            for label, command, args in changes:
+                result = COMMANDS[command](args, book)
+                if isinstance(result, ErrorMessage):
+                    failure = label, result
+                    raise _Rollback
+    except _Rollback:
+        pass
+    return failure
+
+def _rolled_back(label, message):
+    return ErrorMessage(
+        error_message(f"Транзакцію скасовано, книгу не змінено ({label}):") + "\n" + message
+    )
+
+class Transaction:
+    """
+    Зміни, накопичені в сеансі між begin і commit. До commit книга не змінюється:
+    команди лише перевіряються (check_change) і запам'ятовуються, а commit застосовує
+    їх разом (apply_changes). Некоректна команда робить транзакцію невдалою — commit
+    її скасує, тож книга не лишиться зміненою наполовину.
+    """
+    def __init__(self, book_name):
+        self.book_name = book_name
+        self.changes = []
+        self.errors = 0
+
+    def stage(self, command, args):
+        error = check_change(command, args)
+        if error is not None:
+            self.errors += 1
+            return error_message(f"{error} Транзакцію буде скасовано.")
+        label = f"команда {len(self.changes) + 1}: {' '.join((command, *args))}"
+        self.changes.append((label, command, args))
+        return Fore.CYAN + f"Зміну додано до транзакції (змін: {len(self.changes)})." + Style.RESET_ALL
+
+# --- Функции-Обработчики ---
+
+@command("hello", needs_book=False)
+def say_hello(args, book: AddressBook):
+    """Вітається з користувачем."""
+    return Fore.CYAN + "Чим можу допомогти?" + Style.RESET_ALL
+
+@command("close", "exit", exits=True, session=True)
+def exit_bot(args, session):
+    """Завершує роботу: зберігає й закриває всі відкриті книги."""
+    session.books.close_all()
+    message = Fore.CYAN + "До побачення! Дані збережено." + Style.RESET_ALL
+    if session.transaction is not None:
+        session.transaction = None
+        message = Fore.YELLOW + "Незавершену транзакцію скасовано." + Style.RESET_ALL + "\n" + message
+    return message
+
+@command("use", usage="use <книга>", session=True)
+@input_error
+def use_book(args, session):
+    """
+    Перемикає сеанс на книгу з указаною назвою (файл <книга>.bin); нова книга створюється.
+    Без аргументу показує поточну книгу та інші відкриті.
+    """
+    if args:
+        if session.transaction is not None:
+            return error_message("Спершу завершіть транзакцію: commit або rollback.")
+        session.use(args[0])
+        book = session.book
+        return Fore.GREEN + f"Поточна книга: {session.name} (контактів: {len(book)})." + Style.RESET_ALL
+    opened = [name for name in session.books.names() if name != session.name]
+    output = [Fore.CYAN + f"Поточна книга: {session.name}" + Style.RESET_ALL]
+    if opened:
+        output.append("Також відкриті: " + ", ".join(reversed(opened)))
+    return "\n".join(output)
+
+@command("add", arity=2, usage="add <ім'я> <телефон>", mutates=True)
+@input_error
+def add_contact(args, book: AddressBook):
+    """
+    Додає новий контакт або телефон до існуючого контакту.
+    Очікує: [ім'я] [телефон].
+    """
+    name, phone, *_ = args 
+    record = book.find(name)
+
+    if record is None:
+        # Новий запис потрапляє в книгу вже з телефоном: одна зміна і один запис журналу
+        record = Record(name)
+        record.add_phone(phone)
+        book.add_record(record)
+        return Fore.GREEN + "Контакт додано." + Style.RESET_ALL
+
+    record.add_phone(phone)
+
+    return Fore.GREEN + "Контакт оновлено." + Style.RESET_ALL
+
+@command("change", arity=3, usage="change <ім'я> <старий телефон> <новий телефон>", mutates=True)
+@input_error
+def change_contact(args, book: AddressBook):
+    """
+    Змінює номер телефону існуючого контакту.
+    Очікує 3 аргументи: [ім’я] [старий номер] [новий номер].
+    """
+    name, old_phone, new_phone = args
+    
+    record = book.find(name)
+    if record is None:
+        raise KeyError 
+    
+    record.edit_phone(old_phone, new_phone)
+    return Fore.GREEN + f"Телефон {old_phone} для контакту {name} оновлено на {new_phone}." + Style.RESET_ALL
+
+@command("phone", arity=1, usage="phone <ім'я>")
+@input_error
 def show_phone(args, book: AddressBook):
     """
     Показує всі номери телефонів для вказаного контакту.
@@ -256,20 +3074,130 @@ def show_phone(args, book: AddressBook):
     phones_str = '; '.join(p.value for p in record.phones)
     return f"{Fore.CYAN}Контакт {name}:{Style.RESET_ALL} {phones_str}"
 
+@command("find-phone", arity=1, usage="find-phone <телефон>")
+@input_error
+def find_phone(args, book: AddressBook):
+    """
+    Показує контакти, яким належить номер телефону.
+    Очікує 1 аргумент: [телефон].
+    """
+    phone = args[0]
+
+    names = book.find_by_phone(phone)
+    if not names:
+        return Fore.RED + f"Контакт з номером {phone} не знайдено." + Style.RESET_ALL
+
+    return f"{Fore.CYAN}Номер {phone}:{Style.RESET_ALL} {', '.join(names)}"
+
+# Скільки знайдених контактів показує команда search
+SEARCH_LIMIT = 20
+
+@command("search", arity=1, usage="search <префікс> | search ~<ім'я>")
 @input_error
-def show_all(book: AddressBook):
+def search_contacts(args, book: AddressBook):
+    """
+    Шукає контакти за початком імені або, якщо запит починається з ~, за схожим ім'ям.
+    Очікує 1 аргумент: [префікс] або [~ім'я].
+    """
+    query = args[0]
+
+    if query.startswith("~") and len(query) > 1:
+        names = book.search_fuzzy(query[1:], SEARCH_LIMIT)
+        total = len(names)
+    else:
+        names, total = book.search(query, SEARCH_LIMIT)
+
+    if not names:
+        return Fore.RED + f"Контактів за запитом {query} не знайдено." + Style.RESET_ALL
+
+    output = [Fore.CYAN + f"Знайдено контактів: {total}" + Style.RESET_ALL]
+    output.extend(str(book.find(name)) for name in names)
+    if total > len(names):
+        output.append(f"... та ще {total - len(names)}")
+    return "\n".join(output)
+
+# Скільки рядків містить одна порція потокового виводу команди all
+ALL_CHUNK_SIZE = 50
+
+def _parse_all_options(args):
+    """Розбирає параметри команди all: --limit N, --offset M, --sort name."""
+    options = {"limit": None, "offset": 0, "sort": None}
+    args = iter(args)
+    for arg in args:
+        if arg in ("--limit", "--offset"):
+            value = next(args, "")
+            if not is_ascii_number(value):
+                raise UserError(f"Параметр {arg} очікує невід'ємне ціле число.")
+            options[arg[2:]] = int(value)
+        elif arg == "--sort":
+            value = next(args, "")
+            if value != "name":
+                raise UserError("Параметр --sort підтримує лише значення name.")
+            options["sort"] = value
+        else:
+            raise UserError(
+                f"Невідомий параметр {arg}. Використання: all [--limit N] [--offset M] [--sort name]"
+            )
+    return options
+
+def _render_records(records):
+    """Генерує текст записів порціями по ALL_CHUNK_SIZE рядків."""
+    return _chunked(str(record) for record in records)
+
+def _chunked(lines):
+    """Об'єднує рядки в порції потокового виводу по ALL_CHUNK_SIZE рядків."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= ALL_CHUNK_SIZE:
+            yield "\n".join(chunk)
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk)
+
+@command("all", usage="all [--limit N] [--offset M] [--sort name]")
+@input_error
+def show_all(args, book: AddressBook):
     """
     Показує всі збережені контакти.
+    Необов'язкові параметри: --limit N, --offset M, --sort name.
+    Повертає генератор, що видає текст порціями, тож перші рядки
+    з'являються одразу, незалежно від розміру книги.
     """
-    if not book.data:
+    options = _parse_all_options(args)
+    key = ("all", book._version, options["sort"], options["offset"], options["limit"])
+    cached = book._results.get(key)
+    if cached is not None:
+        return iter(cached)
+
+    chunks = _render_records(book.iter_records(**options))
+    first = next(chunks, None)
+
+    if first is None:
+        if options["offset"]:
+            return Fore.RED + "На цій сторінці контактів немає." + Style.RESET_ALL
         return Fore.RED + "Немає збережених контактів." + Style.RESET_ALL
-    
-    result = []
-    for record in book.data.values():
-        result.append(str(record))
-        
-    return "\n".join(result)
 
+    return _caching_chunks(book, key, chain((first,), chunks))
+
+def _caching_chunks(book, key, chunks):
+    """
+    Пропускає порції відповіді і, якщо їх дочитали до кінця, зберігає відповідь у кеш.
+    Відповідь, довша за ліміт кешу, не накопичується, щоб не втратити переваг потокового виводу.
+    """
+    collected, size = [], 0
+    for chunk in chunks:
+        if collected is not None:
+            size += len(chunk)
+            collected.append(chunk)
+            if size > book._results.max_chars:
+                collected = None
+        yield chunk
+    # Якщо книга змінилася під час виводу, відповідь могла змішати дві версії
+    if collected is not None and book._version == key[1]:
+        book._results.put(key, tuple(collected))
+
+@command("add-birthday", arity=2, usage="add-birthday <ім'я> <DD.MM.YYYY>", mutates=True)
 @input_error
 def add_birthday(args, book: AddressBook):
     """
@@ -285,6 +3213,7 @@ def add_birthday(args, book: AddressBook):
     record.add_birthday(birthday) 
     return Fore.GREEN + f"День народження для контакту {name} додано." + Style.RESET_ALL
 
+@command("show-birthday", arity=1, usage="show-birthday <ім'я>")
 @input_error
 def show_birthday(args, book: AddressBook):
     """
@@ -302,26 +3231,124 @@ def show_birthday(args, book: AddressBook):
     else:
         return Fore.RED + f"День народження для контакту {name} не встановлено." + Style.RESET_ALL
 
+# Найдовше вікно команди birthdays. Вікно з N днів охоплює N + 1 дат (сьогодні включно),
+# тож 364 — це 365 різних дат: далі сьогоднішні й завтрашні іменинники з'являлися б
+# у відповіді вдруге, уже з датою наступного року
+MAX_BIRTHDAY_WINDOW = 364
+
+@command("birthdays", usage="birthdays [кількість днів]")
 @input_error
 def birthdays(args, book: AddressBook):
     """
     Повертає список користувачів, яких потрібно привітати по днях на наступному тижні.
+    Необов'язковий аргумент: [кількість днів] — довжина вікна (за замовчуванням 7).
     """
-    upcoming = book.get_upcoming_birthdays()
+    days = 7
+    if args:
+        if not is_ascii_number(args[0]):
+            raise UserError("Кількість днів має бути невід'ємним цілим числом.")
+        days = int(args[0])
+        if days > MAX_BIRTHDAY_WINDOW:
+            raise UserError(f"Кількість днів не може перевищувати {MAX_BIRTHDAY_WINDOW}.")
+
+    # Відповідь залежить лише від складу книги, довжини вікна і сьогоднішньої дати
+    key = ("birthdays", book._version, date.today(), days)
+    cached = book._results.get(key)
+    if cached is not None:
+        return cached[0]
+
+    upcoming = book.get_upcoming_birthdays(days)
     if not upcoming:
-        return Fore.CYAN + "Наступного тижня іменинників немає." + Style.RESET_ALL
-    
-    output = [Fore.CYAN + "Наступні дні народження:" + Style.RESET_ALL]
-    
-    # Сортируем даты для последовательного вывода
-    sorted_dates = sorted(upcoming.keys(), key=lambda x: datetime.strptime(x, "%d.%m.%Y"))
-    
-    for date_str in sorted_dates:
-        names = ", ".join(upcoming[date_str])
-        output.append(f"{date_str}: {names}")
-        
-    return "\n".join(output)
+        if days == 7:
+            result = Fore.CYAN + "Наступного тижня іменинників немає." + Style.RESET_ALL
+        else:
+            result = Fore.CYAN + f"Протягом {days} днів іменинників немає." + Style.RESET_ALL
+    else:
+        output = [Fore.CYAN + "Наступні дні народження:" + Style.RESET_ALL]
+
+        # Дати вже йдуть у хронологічному порядку, додаткове сортування не потрібне
+        for date_str, names in upcoming.items():
+            output.append(f"{date_str}: {', '.join(names)}")
+        result = "\n".join(output)
+
+    book._results.put(key, (result,))
+    return result
+
+@command("import", arity=1, usage="import <файл.csv|файл.vcf>", local_only=True, bulk=True)
+@input_error
+def import_file(args, book: AddressBook):
+    """
+    Імпортує контакти з файлу CSV або vCard.
+    Очікує 1 аргумент: [шлях до файлу .csv або .vcf].
+    """
+    path = args[0]
+    imported, rejected, rejects_path = import_contacts(book, path)
+    message = Fore.GREEN + f"Імпортовано контактів: {imported}." + Style.RESET_ALL
+    if rejected:
+        message += Fore.RED + f" Відхилено: {rejected} (див. {rejects_path})." + Style.RESET_ALL
+    return message
+
+@command("export", arity=1, usage="export <файл.csv|файл.vcf>", local_only=True)
+@input_error
+def export_file(args, book: AddressBook):
+    """
+    Експортує всі контакти у файл CSV або vCard.
+    Очікує 1 аргумент: [шлях до файлу .csv або .vcf].
+    """
+    path = args[0]
+    count = export_contacts(book, path)
+    return Fore.GREEN + f"Експортовано контактів: {count} у {path}." + Style.RESET_ALL
+
+def _parse_export_changes_args(args):
+    """Розбирає параметри команди export-changes і повертає (since, шлях файлу або None)."""
+    since, path = 0, None
+    args = iter(args)
+    for arg in args:
+        if arg == "--since":
+            value = next(args, "")
+            if not is_ascii_number(value):
+                raise UserError("Параметр --since очікує невід'ємне ціле число.")
+            since = int(value)
+        elif path is None and not arg.startswith("--"):
+            path = arg
+        else:
+            raise UserError(
+                f"Невідомий параметр {arg}. Використання: export-changes [--since N] [файл.jsonl]"
+            )
+    return since, path
+
+def _export_changes_to_file(args):
+    try:
+        return _parse_export_changes_args(args)[1] is not None
+    except ValueError:
+        # Помилку в параметрах повідомить сама команда
+        return False
+
+@command("export-changes", usage="export-changes [--since N] [файл.jsonl]", local_only=_export_changes_to_file)
+@input_error
+def export_change_feed(args, book: AddressBook):
+    """
+    Експортує зміни книги з номерами після N (за замовчуванням — усі) у форматі JSON Lines:
+    змінені контакти цілком і «надгробки» видалених. Номер останньої зміни —
+    курсор для наступного експорту. Без файлу зміни виводяться потоково.
+    """
+    since, path = _parse_export_changes_args(args)
+    if 0 < since < feed_floor(book):
+        raise UserError(
+            f"Курсор {since} застарів: видалення зберігаються лише для останніх {FEED_RETENTION} змін. "
+            f"Почніть повну синхронізацію: export-changes --since 0"
+        )
+    if path is not None:
+        count, last = export_changes(book, path, since)
+        return Fore.GREEN + f"Експортовано змін: {count} у {path}. Наступний експорт: --since {last}" + Style.RESET_ALL
+
+    chunks = _chunked(json.dumps(change_entry(*change), ensure_ascii=False) for change in book.changes_since(since))
+    first = next(chunks, None)
+    if first is None:
+        return Fore.CYAN + f"Змін після {since} немає." + Style.RESET_ALL
+    return chain((first,), chunks)
 
+@command("delete", arity=1, usage="delete <ім'я>", mutates=True)
 @input_error
 def delete_contact(args, book: AddressBook):
     """
@@ -332,49 +3359,792 @@ def delete_contact(args, book: AddressBook):
     book.delete(name)
     return Fore.GREEN + f"Контакт {name} видалено." + Style.RESET_ALL
 
+# Скільки груп дублікатів кожного виду показує команда dedupe
+DEDUPE_SHOWN = 20
+
+def _listed(lines, shown):
+    """Перші shown рядків і, якщо їх більше, рядок про решту."""
+    output = lines[:shown]
+    if len(lines) > shown:
+        output.append(f"... та ще {len(lines) - shown}")
+    return output
+
+def _duplicates_report(shared, similar):
+    """Рядки звіту про ймовірні дублікати між контактами (порожній список, якщо їх немає)."""
+    output = []
+    if shared:
+        output.append(Fore.CYAN + f"Номери, що належать кільком контактам: {len(shared)}" + Style.RESET_ALL)
+        output.extend(_listed([f"{number}: {', '.join(names)}" for number, names in shared.items()], DEDUPE_SHOWN))
+    if similar:
+        output.append(Fore.CYAN + f"Майже однакові імена: {len(similar)}" + Style.RESET_ALL)
+        output.extend(_listed([", ".join(names) for names in similar], DEDUPE_SHOWN))
+    if output:
+        output.append("Об'єднати контакти: merge <ім'я> <ім'я дубліката>")
+    return output
+
+@command("duplicates")
+@input_error
+def show_duplicates(args, book: AddressBook):
+    """
+    Показує ймовірні дублікати, нічого не змінюючи: повторні номери всередині контактів
+    (їх прибирає dedupe), спільні номери та майже однакові імена (їх об'єднує merge).
+    Працює й під час транзакції, де dedupe лише додається до змін.
+    """
+    repeated, shared, similar = find_duplicates(book)
+    output = []
+    if repeated:
+        output.append(
+            Fore.CYAN + f"Контакти з повторними номерами: {len(repeated)} (прибрати: dedupe)" + Style.RESET_ALL
+        )
+        output.extend(_listed(sorted(repeated), DEDUPE_SHOWN))
+    output.extend(_duplicates_report(shared, similar))
+    if not output:
+        return Fore.CYAN + "Дублікатів не знайдено." + Style.RESET_ALL
+    return "\n".join(output)
+
+@command("dedupe", mutates=True)
+@input_error
+def dedupe(args, book: AddressBook):
+    """
+    Прибирає повторні номери всередині контактів і показує ймовірні дублікати
+    між контактами: спільні номери та майже однакові імена (їх об'єднує merge).
+    """
+    repeated, shared, similar = find_duplicates(book)
+    removed = sum(book.find(name).dedupe_phones() for name in repeated)
+
+    output = []
+    if removed:
+        output.append(
+            Fore.GREEN + f"Прибрано повторних номерів: {removed} (контактів: {len(repeated)})." + Style.RESET_ALL
+        )
+    output.extend(_duplicates_report(shared, similar))
+    if not output:
+        return Fore.CYAN + "Дублікатів не знайдено." + Style.RESET_ALL
+    return "\n".join(output)
+
+@command("merge", arity=2, usage="merge <ім'я> <ім'я дубліката>", mutates=True)
+@input_error
+def merge_contacts(args, book: AddressBook):
+    """
+    Об'єднує два контакти: номери (крім тих, що вже є) і день народження (якщо його ще немає)
+    другого контакту переносяться в перший, а другий видаляється.
+    Очікує 2 аргументи: [ім'я] [ім'я дубліката].
+    """
+    name, duplicate = args[:2]
+    if name == duplicate:
+        return error_message("Вкажіть два різні контакти.")
+    record, other = book.find(name), book.find(duplicate)
+    if record is None or other is None:
+        raise KeyError
+
+    added = 0
+    for phone in other.phones:
+        if record.find_phone(phone.value) is None:
+            record.add_phone(phone.value)
+            added += 1
+    if record.birthday is None and other.birthday is not None:
+        record.add_birthday(other.birthday.value)
+    book.delete(duplicate)
+    return Fore.GREEN + f"Контакт {duplicate} об'єднано з {name}, додано номерів: {added}." + Style.RESET_ALL
+
+@command("begin", session=True)
+def begin_transaction(args, session):
+    """Починає транзакцію: наступні зміни книги накопичуються і застосовуються командою commit."""
+    if session.transaction is not None:
+        return error_message("Транзакцію вже розпочато. Завершіть її: commit або rollback.")
+    session.transaction = Transaction(session.name)
+    return Fore.CYAN + "Транзакцію розпочато. Зміни буде застосовано командою commit." + Style.RESET_ALL
+
+@command("commit", session=True)
+@input_error
+def commit_transaction(args, session):
+    """Застосовує всі зміни транзакції разом або, якщо хоч одна неможлива, жодної."""
+    transaction, session.transaction = session.transaction, None
+    if transaction is None:
+        return error_message("Транзакцію не розпочато.")
+    if transaction.errors:
+        return error_message(
+            f"Транзакцію скасовано, книгу не змінено: команд з помилками — {transaction.errors}."
+        )
+    failure = apply_changes(session.books.get(transaction.book_name), transaction.changes)
+    if failure is not None:
+        return _rolled_back(*failure)
+    return Fore.GREEN + f"Транзакцію застосовано, змін: {len(transaction.changes)}." + Style.RESET_ALL
+
+@command("rollback", session=True)
+def rollback_transaction(args, session):
+    """Відкидає накопичені зміни транзакції."""
+    transaction, session.transaction = session.transaction, None
+    if transaction is None:
+        return error_message("Транзакцію не розпочато.")
+    return Fore.GREEN + f"Транзакцію скасовано, відкинуто змін: {len(transaction.changes)}." + Style.RESET_ALL
+
+# Скільки помилок перевірки файлу показує команда apply
+APPLY_ERRORS_SHOWN = 10
+
+@command("apply", arity=1, usage="apply <файл>", session=True, local_only=True)
+@input_error
+def apply_file(args, session):
+    """
+    Застосовує команди змін з файлу (по одній на рядок, як у пакетному режимі) однією
+    транзакцією. Спершу перевіряються всі рядки; якщо хоч один некоректний або не
+    виконується, книга лишається без змін.
+    Очікує 1 аргумент: [шлях до файлу].
+    """
+    if session.transaction is not None:
+        return error_message("Спершу завершіть транзакцію: commit або rollback.")
+    path = args[0]
+    if not os.path.exists(path):
+        raise UserError(f"Файл {path} не знайдено.")
+
+    changes, errors = [], []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            command, command_args = parse_input(line)
+            if not command or command.startswith("#"):
+                continue
+            error = check_change(command, command_args)
+            if error is None:
+                changes.append((f"{path}:{line_number}", command, command_args))
+            else:
+                errors.append(f"{path}:{line_number}: {error}")
+
+    if errors:
+        output = [error_message(f"Файл {path} не застосовано, рядків з помилками: {len(errors)}.")]
+        output.extend(errors[:APPLY_ERRORS_SHOWN])
+        if len(errors) > APPLY_ERRORS_SHOWN:
+            output.append(f"... та ще {len(errors) - APPLY_ERRORS_SHOWN}")
+        return ErrorMessage("\n".join(output))
+
+    failure = apply_changes(session.book, changes)
+    if failure is not None:
+        return _rolled_back(*failure)
+    return Fore.GREEN + f"Застосовано змін з {path}: {len(changes)}." + Style.RESET_ALL
+
 # --- Основная Функция ---
 
 FILE_NAME = "address_book.bin"
+SQLITE_FILE_NAME = "address_book.db"
+
+@command("stats", usage="stats [--json [файл]]", needs_book=False, local_only=lambda args: len(args) > 1)
+@input_error
+def show_stats(args, book: AddressBook):
+    """
+    Показує кількість викликів і затримки (p50/p95/p99) кожної команди.
+    З параметром --json виводить ті самі дані у форматі JSON або записує їх у файл.
+    """
+    summary = STATS.summary()
+
+    if args and args[0] == "--json":
+        data = json.dumps(summary, ensure_ascii=False, indent=2)
+        if len(args) > 1:
+            with open(args[1], "w", encoding="utf-8") as f:
+                f.write(data + "\n")
+            return Fore.GREEN + f"Статистику збережено в {args[1]}." + Style.RESET_ALL
+        return data
+
+    if not summary:
+        return Fore.CYAN + "Статистики ще немає." + Style.RESET_ALL
+
+    output = [Fore.CYAN + f"{'Команда':<15}{'Викликів':>10}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}" + Style.RESET_ALL]
+    for name, row in summary.items():
+        output.append(
+            f"{name:<15}{row['count']:>10}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}"
+        )
+    return "\n".join(output)
+
+@command("cache-stats")
+def show_cache_stats(args, book: AddressBook):
+    """Показує, як часто відповіді на birthdays і all береться з кешу."""
+    summary = book._results.summary()
+    if not summary:
+        return Fore.CYAN + "Кеш ще не використовувався." + Style.RESET_ALL
+
+    output = [Fore.CYAN + f"{'Запит':<15}{'Влучань':>10}{'Промахів':>10}{'Частка':>10}" + Style.RESET_ALL]
+    for kind, row in summary.items():
+        output.append(f"{kind:<15}{row['hits']:>10}{row['misses']:>10}{row['hit_rate']:>10.1%}")
+    output.append(f"Збережено відповідей: {len(book._results)}")
+    return "\n".join(output)
+
+def handle_command(command, args, session):
+    """
+    Виконує одну команду через таблицю COMMANDS у сеансі session і повертає текст
+    відповіді або, для довгих відповідей, ітератор порцій тексту.
+    Повідомлення про помилки повертаються як ErrorMessage.
+    """
+    entry = COMMANDS.get(command)
+    if entry is None:
+        return error_message("Невідома команда.")
+    if entry.session:
+        return entry(args, session)
+    if entry.bulk and session.transaction is not None:
+        return error_message(f"Команда {command} недоступна під час транзакції: спершу commit або rollback.")
+    if entry.mutates and session.transaction is not None:
+        return session.transaction.stage(command, args)
+    if not entry.needs_book:
+        return entry(args, None)
+    try:
+        book = session.book
+    except ValueError as e:
+        # Поточну книгу не вдалося відкрити (наприклад, файл пошкоджено)
+        return error_message(str(e))
+    return entry(args, book)
+
+def run_batch(source, session, checkpoint=0, output=None, errors=None):
+    """
+    Пакетний режим: виконує команди з файлу або потоку source по одній на рядок
+    у сеансі session, без запрошення до вводу. Порожні рядки та рядки з # пропускаються.
+    Відповіді буферизуються, помилки виводяться з номером рядка.
+    Відкриті книги зберігаються один раз наприкінці та після кожних checkpoint виконаних
+    команд (якщо checkpoint > 0); порожні рядки й коментарі до них не враховуються.
+    Повертає кількість рядків з помилками.
+    """
+    output = output or sys.stdout
+    errors = errors or sys.stderr
+    name = getattr(source, "name", "-")
+    buffer = []
+    failed = 0
+    # Кількість команд, виконаних після останнього збереження
+    unsaved = 0
+
+    books = session.books
+    with books.deferred_writes():
+        try:
+            for line_number, line in enumerate(source, 1):
+                command, args = parse_input(line)
+                if not command or command.startswith("#"):
+                    continue
+                if command in COMMANDS and COMMANDS[command].exits:
+                    break
+                result = handle_command(command, args, session)
+                unsaved += 1
+                if checkpoint and unsaved >= checkpoint:
+                    books.save_all()
+                    unsaved = 0
+                if isinstance(result, ErrorMessage):
+                    failed += 1
+                    errors.write(f"{name}:{line_number}: {result}\n")
+                    continue
+                for chunk in (result,) if isinstance(result, str) else result:
+                    buffer.append(chunk)
+                    if len(buffer) >= 1024:
+                        buffer.append("")
+                        output.write("\n".join(buffer))
+                        buffer.clear()
+            if session.transaction is not None:
+                session.transaction = None
+                failed += 1
+                errors.write(f"{name}: транзакцію не завершено командою commit, її зміни відкинуто\n")
+        finally:
+            if buffer:
+                buffer.append("")
+                output.write("\n".join(buffer))
+            output.flush()
+            books.save_all()
+
+    return failed
+
+def write_output(result, stream=None, pager=True):
+    """
+    Виводить відповідь команди. Ітератор порцій виводиться по мірі надходження;
+    якщо вивід — термінал, після кожного екрана очікується Enter (q — припинити вивід).
+    """
+    stream = stream or sys.stdout
+    if isinstance(result, str):
+        stream.write(result + "\n")
+        return
+    if not (pager and stream.isatty()):
+        for chunk in result:
+            stream.write(chunk + "\n")
+        return
+    page_size = max(shutil.get_terminal_size().lines - 1, 1)
+    shown = 0
+    for chunk in result:
+        for line in chunk.split("\n"):
+            if shown == page_size:
+                answer = input(Fore.YELLOW + "-- Далі: Enter, припинити: q --" + Style.RESET_ALL)
+                if answer.strip().lower() == "q":
+                    return
+                shown = 0
+            stream.write(line + "\n")
+            shown += 1
+
+# --- Доповнення вводу ---
+
+# Скільки імен контактів пропонує доповнення клавішею Tab
+COMPLETION_LIMIT = 50
+
+# Скільки перших аргументів команди — імена контактів
+NAME_ARGUMENTS = {
+    "add": 1, "change": 1, "phone": 1, "add-birthday": 1,
+    "show-birthday": 1, "delete": 1, "merge": 2,
+}
+
+# Керуючі послідовності кольорів colorama
+_ANSI_CODE = re.compile(r"\x1b\[[0-9;]*m")
+
+class Completer:
+    """
+    Доповнення вводу клавішею Tab (readline): перше слово доповнюється назвою команди
+    з COMMANDS, а аргументи-імена — іменами контактів поточної книги за префіксом.
+    Імена беруться з відсортованого індексу книги, який оновлюється з кожною зміною,
+    тож пошук коштує O(log N + limit) навіть для сотень тисяч контактів.
+    """
+    def __init__(self, session, limit=COMPLETION_LIMIT):
+        self.session = session
+        self.limit = limit
+        self._matches = []
+
+    def matches(self, line, begin, text):
+        """Варіанти доповнення слова text, що починається в рядку line з позиції begin."""
+        words = line[:begin].split()
+        if not words:
+            return sorted(name for name in COMMANDS if name.startswith(text.lower()))
+        entry = COMMANDS.get(words[0].lower())
+        if entry is None or len(words) > NAME_ARGUMENTS.get(entry.name, 0):
+            return []
+        if not self.session.books.ready(self.session.name):
+            # Книга ще завантажується у фоні: Tab не має блокувати ввід
+            return []
+        return self.session.book.names_with_prefix(text, self.limit)
+
+    def __call__(self, text, state):
+        # readline викликає функцію з state = 0, 1, 2... доки вона не поверне None
+        if state == 0:
+            try:
+                self._matches = self.matches(readline.get_line_buffer(), readline.get_begidx(), text)
+            except Exception:
+                # Виключення readline все одно проковтнув би; без варіантів ввід просто не доповнюється
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+
+def install_completion(session):
+    """Вмикає доповнення клавішею Tab для input(). Повертає False, якщо readline недоступний."""
+    if readline is None:
+        return False
+    readline.set_completer(Completer(session))
+    # Імена можуть містити апостроф, дефіс тощо, тож слова розділяються лише пробілами
+    readline.set_completer_delims(" \t\n")
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+        readline.parse_and_bind("set completion-ignore-case on")
+    return True
+
+def readline_prompt(prompt):
+    """Позначає кольорові коди в запрошенні як недруковані, щоб readline правильно рахував його ширину."""
+    return _ANSI_CODE.sub("\001\\g<0>\002", prompt)
+
+# --- Серверний режим ---
 
-def main():
+class BackgroundSaver:
+    """
+    Переписує знімок книги, не зупиняючи обслуговування клієнтів: книга серіалізується
+    в циклі подій (тож знімок узгоджений), а запис на диск виконується в окремому потоці.
+    Одночасно виконується не більше одного збереження.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.pending = None
+
+    def __call__(self, book):
+        if self.pending is not None and not self.pending.done():
+            return
+        data, offset, changes = book._take_snapshot()
+        self.pending = self.loop.run_in_executor(None, book._write_snapshot, book._filename, data)
+        self.pending.add_done_callback(lambda future: self._saved(book, offset, changes, future))
+
+    @staticmethod
+    def _saved(book, offset, changes, future):
+        if future.cancelled() or future.exception() is not None:
+            # Журнал не чіпаємо: зміни залишаються в ньому до наступного знімка
+            return
+        book._snapshot_written(offset, changes)
+
+    async def wait(self):
+        """Очікує завершення збереження, що виконується."""
+        if self.pending is not None:
+            import asyncio
+            await asyncio.wait([self.pending])
+
+class BotServer:
+    """
+    Обслуговує клієнтів по TCP та Unix-сокету тим самим рядковим протоколом, що й консоль:
+    одна команда в рядку, відповідь завершується порожнім рядком.
+    Усі клієнти працюють з однією книгою. Команди виконуються в циклі подій
+    по одній, тож зміни книги впорядковані без блокувань.
+    """
+    def __init__(self, books, default_book=DEFAULT_BOOK):
+        self.books = books
+        self.default_book = default_book
+        self.saver = None
+        self.servers = []
+
+    @staticmethod
+    def _frame(result):
+        """Збирає відповідь команди в текст, завершений порожнім рядком."""
+        chunks = (result,) if isinstance(result, str) else result
+        # Порожні рядки всередині відповіді прибираємо: порожній рядок — це її кінець
+        lines = [line for chunk in chunks for line in chunk.split("\n") if line]
+        if not lines:
+            # Порожня відповідь — лише завершальний порожній рядок
+            return b"\n"
+        return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+    def execute(self, line, session):
+        """
+        Виконує рядок-команду і повертає відповідь у байтах та ознаку завершення сеансу.
+        Потокова відповідь дочитується одразу, щоб інші клієнти не змінили книгу посеред неї.
+        """
+        command, args = parse_input(line)
+        if not command:
+            return self._frame(""), False
+        entry = COMMANDS.get(command)
+        if entry is not None and entry.exits:
+            # Завершується лише сеанс клієнта; книга лишається відкритою для інших
+            return self._frame("До побачення!"), True
+        if entry is not None and entry.is_local_only(args):
+            return self._frame(
+                f"Команда {command} працює з файлами на машині бота і недоступна через мережу."
+            ), False
+        try:
+            return self._frame(handle_command(command, args, session)), False
+        except Exception as e:
+            return self._frame(f"Помилка: {e}"), False
+
+    def _attach_saver(self, book):
+        if getattr(book, "_journal", None) is not None:
+            book._compactor = self.saver
+        return book
+
+    @staticmethod
+    def _close_book(book):
+        """
+        Закриває книгу, витіснену з кешу. Знімок не потрібен: усі зміни вже в журналі.
+        Якщо для книги ще триває фонове збереження, воно вже не чіпатиме її журнал.
+        """
+        book._compactor = None
+        book.close()
+        book._journal = None
+
+    async def handle_client(self, reader, writer):
+        # У кожного клієнта своя поточна книга (use), книги спільні для всіх
+        session = Session(self.books, self.default_book)
+        try:
+            writer.write(self._frame("Вітаю у помічнику-боті!"))
+            await writer.drain()
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Рядок довший за ліміт буфера читання
+                    break
+                if not line:
+                    break
+                response, done = self.execute(line.decode("utf-8", errors="replace"), session)
+                writer.write(response)
+                await writer.drain()
+                if done:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=None, port=None, unix_path=None, log=None):
+        """Запускає сервери і працює до SIGINT/SIGTERM; наприкінці дочікується збереження."""
+        import asyncio
+        log = log or sys.stderr
+        loop = asyncio.get_running_loop()
+        self.saver = BackgroundSaver(loop)
+        # Книги, які відкриватимуть клієнти, теж зберігаються у фоні
+        opener = self.books.opener
+        self.books.opener = lambda name: self._attach_saver(opener(name))
+        self.books.closer = self._close_book
+        for name in self.books.names():
+            self._attach_saver(self.books.get(name))
+        if port is not None:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            self.servers.append(server)
+            for sock in server.sockets:
+                log.write(f"Очікую клієнтів на {sock.getsockname()}\n")
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, unix_path)
+            self.servers.append(server)
+            log.write(f"Очікую клієнтів на {unix_path}\n")
+
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, AttributeError):
+                # Windows: зупинка лише через KeyboardInterrupt
+                pass
+        try:
+            await stop.wait()
+        finally:
+            for server in self.servers:
+                server.close()
+                await server.wait_closed()
+            if unix_path is not None and os.path.exists(unix_path):
+                os.unlink(unix_path)
+            await self.saver.wait()
+
+class StartupReport:
+    """
+    Звіт --startup-report: скільки тривав кожен етап запуску — імпорт модулів,
+    виконання bot.py, розбір аргументів, кольори, завантаження книги.
+    """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.phases = [
+            ("імпорт модулів", _IMPORTS_DONE - _IMPORT_STARTED),
+            ("виконання bot.py", _MODULE_LOADED - _IMPORTS_DONE),
+        ]
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def write(self, title):
+        """Виводить усі етапи і загальний час від початку імпорту bot.py під назвою title."""
+        lines = [f"{name:<32}{seconds * 1000:>10.1f} мс" for name, seconds in self.phases]
+        lines.append(f"{title:<32}{(time.perf_counter() - _IMPORT_STARTED) * 1000:>10.1f} мс")
+        self.stream.write("\n".join(lines) + "\n")
+
+    def book_opened(self, name, opening):
+        """Для Session.use(wait=False): повідомляє, скільки книга завантажувалась у фоні."""
+        if opening.error is not None:
+            self.stream.write(f"Книгу {name} не вдалося завантажити у фоні: {opening.error}\n")
+        else:
+            self.stream.write(f"Книгу {name} завантажено у фоні за {opening.elapsed * 1000:.1f} мс\n")
+
+def parse_args(argv=None):
+    """Розбирає аргументи командного рядка."""
+    parser = argparse.ArgumentParser(description="Консольний бот-помічник з адресною книгою.")
+    parser.add_argument(
+        "--storage", choices=("pickle", "sqlite"), default="pickle",
+        help=f"сховище книги: файл {FILE_NAME} або база {SQLITE_FILE_NAME} (SQLite)",
+    )
+    parser.add_argument(
+        "--migrate", action="store_true",
+        help=f"перенести книгу --book з файлу в базу SQLite ({FILE_NAME} у {SQLITE_FILE_NAME}) і вийти",
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="виконати команди з файлу (або зі stdin, якщо FILE — це '-') і вийти",
+    )
+    parser.add_argument(
+        "--checkpoint", type=int, default=0, metavar="N",
+        help="у пакетному режимі зберігати книгу після кожних N виконаних команд",
+    )
+    parser.add_argument(
+        "--no-pager", action="store_true",
+        help="не зупиняти довгий вивід після кожного екрана",
+    )
+    parser.add_argument(
+        "--no-color", action="store_true",
+        help="виводити текст без кольорів, не завантажуючи colorama (так само, якщо задано змінну NO_COLOR)",
+    )
+    parser.add_argument(
+        "--background-load", action="store_true",
+        help="показати запрошення до вводу одразу, а книгу завантажувати у фоновому потоці",
+    )
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="вивести у stderr, скільки тривали імпорт модулів, завантаження книги та інші етапи запуску",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="профілювати кожну команду (cProfile) і записувати профілі в каталог --profile-dir",
+    )
+    parser.add_argument(
+        "--trace-slow", type=float, metavar="MS",
+        help="для команд, довших за MS мілісекунд, записувати знімок пам'яті tracemalloc у --profile-dir",
+    )
+    parser.add_argument(
+        "--profile-dir", default="profiles", metavar="DIR",
+        help="каталог для профілів і знімків пам'яті (за замовчуванням %(default)s)",
+    )
+    parser.add_argument(
+        "--book", default=DEFAULT_BOOK, metavar="NAME",
+        help="книга, з якою почати роботу (файл NAME.bin; за замовчуванням — %(default)s.bin)",
+    )
+    parser.add_argument(
+        "--max-books", type=int, default=8, metavar="N",
+        help="скільки книг тримати відкритими одночасно; найдавніше використані зберігаються й закриваються",
+    )
+    parser.add_argument(
+        "--shards", type=int, default=0, metavar="N",
+        help=f"розділити книгу за хешем імені на N файлів {FILE_NAME}.1-of-N ..., що завантажуються паралельно",
+    )
+    parser.add_argument(
+        "--autosave", type=float, default=60, metavar="SECONDS",
+        help="зберігати знімок книги у фоні раз на SECONDS секунд, якщо були зміни (0 — вимкнути)",
+    )
+    parser.add_argument(
+        "--autosave-changes", type=int, default=500, metavar="N",
+        help="зберігати знімок у фоні одразу після N змін (за замовчуванням %(default)s)",
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="працювати як сервер: приймати команди по TCP (--host, --port) та/або Unix-сокету (--unix)",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="адреса TCP-сервера (за замовчуванням %(default)s)")
+    parser.add_argument("--port", type=int, default=8765, help="порт TCP-сервера (за замовчуванням %(default)s)")
+    parser.add_argument("--unix", metavar="PATH", help="шлях Unix-сокета")
+    parser.add_argument("--no-tcp", action="store_true", help="у режимі сервера не відкривати TCP-порт")
+    options = parser.parse_args(argv)
+    if options.shards > 1 and options.storage == "sqlite":
+        parser.error("--shards працює лише з файловим сховищем")
+    if options.max_books < 1:
+        # Інакше BookCache закривав би щойно відкриту книгу ще до першої команди
+        parser.error("--max-books має бути щонайменше 1")
+    return options
+
+def open_book(storage, concurrent=False, shards=0, name=DEFAULT_BOOK):
+    """
+    Відкриває адресну книгу name у вибраному сховищі.
+    concurrent=True відкриває потокобезпечну книгу (потрібно для автозбереження),
+    shards > 1 — книгу, розділену на стільки файлів.
+    """
+    filename = book_path(name, storage)
+    if storage == "sqlite":
+        return SQLiteAddressBook.load_from_file(filename)
+    if shards > 1:
+        return ShardedAddressBook.load_from_file(filename, shards)
+    if concurrent:
+        return ConcurrentAddressBook.load_from_file(filename)
+    return AddressBook.load_from_file(filename)
+
+def main(argv=None):
     """
     Основна функція бота, що керує циклом обробки команд.
+    Повертає код завершення процесу.
     """
-    # Завантажуємо дані при запуску.
-    book = AddressBook.load_from_file(FILE_NAME)
+    report = StartupReport()
+    with report.phase("розбір аргументів"):
+        options = parse_args(argv)
+
+    # Пакетний і серверний режими виводять текст без кольорів
+    if not (options.no_color or os.environ.get("NO_COLOR") or options.batch or options.serve):
+        with report.phase("кольори (colorama)"):
+            enable_colors()
+
+    if options.migrate:
+        # Файли книги --book визначаються так само, як під час її відкриття (open_book)
+        try:
+            source, target = book_path(options.book, "pickle"), book_path(options.book, "sqlite")
+        except ValueError as e:
+            print(Fore.RED + str(e) + Style.RESET_ALL)
+            return 1
+        book = SQLiteAddressBook.migrate_from_pickle(source, target)
+        print(Fore.GREEN + f"Контакти перенесено в {target}: {len(book)}." + Style.RESET_ALL)
+        book.close()
+        return 0
+
+    if options.profile or options.trace_slow is not None:
+        CommandProfiler(options.profile_dir, options.profile, options.trace_slow).install(COMMANDS)
+
+    # Автозбереження потрібне лише в діалоговому режимі: пакетний режим зберігає
+    # книгу сам, а сервер переписує знімок у фоні
+    autosave = (
+        options.autosave > 0 and options.storage == "pickle" and options.shards <= 1
+        and not options.batch and not options.serve
+    )
+
+    def open_named(name):
+        book = open_book(options.storage, concurrent=autosave, shards=options.shards, name=name)
+        if autosave:
+            AutoSaver(book, options.autosave, options.autosave_changes).start()
+        return book
+
+    def close_book(book):
+        # AutoSaver під час зупинки сам зберігає те, що ще не потрапило до знімка
+        saver = getattr(book, "_compactor", None)
+        if isinstance(saver, AutoSaver):
+            saver.stop()
+            book.close()
+        else:
+            flush_and_close(book)
+
+    books = BookCache(open_named, options.max_books, close_book)
+    session = Session(books, options.book)
+
+    # Завантажуємо дані при запуску. У діалоговому режимі з --background-load
+    # книга завантажується у фоні, а чекають на неї лише команди, яким потрібні дані
+    background = options.background_load and not options.batch and not options.serve
+    try:
+        if background:
+            with report.phase("запуск фонового завантаження"):
+                session.use(options.book, wait=False, done=report.book_opened if options.startup_report else None)
+        else:
+            with report.phase("завантаження книги"):
+                session.use(options.book)
+    except ValueError as e:
+        print(Fore.RED + str(e) + Style.RESET_ALL)
+        return 1
+
+    if options.startup_report and (options.batch or options.serve):
+        report.write("усього до виконання команд")
+
+    if options.batch:
+        if options.batch == "-":
+            failed = run_batch(sys.stdin, session, options.checkpoint)
+        else:
+            with open(options.batch, encoding="utf-8") as source:
+                failed = run_batch(source, session, options.checkpoint)
+        # run_batch уже зберіг усі книги
+        books.closer = lambda book: book.close()
+        books.close_all()
+        return 1 if failed else 0
+
+    if options.serve:
+        import asyncio
+        server = BotServer(books, options.book)
+        try:
+            asyncio.run(server.serve(
+                None if options.no_tcp else options.host,
+                None if options.no_tcp else options.port,
+                options.unix,
+            ))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            books.close_all()
+        return 0
     
     print(Fore.CYAN + "Вітаю у помічнику-боті!"+ Style.RESET_ALL)
 
-    while True:
-        user_input = input(Fore.YELLOW + "Введіть команду: " + Style.RESET_ALL)
-
-        command, args = parse_input(user_input)
-
-        if command in ["close", "exit"]:
-            # Зберігаємо дані перед виходом
-            book.save_to_file(FILE_NAME)
-            print(Fore.CYAN + "До побачення! Дані збережено." + Style.RESET_ALL)
-            break
-        elif command == "hello":
-            print(Fore.CYAN + "Чим можу допомогти?" + Style.RESET_ALL)
-        elif command == "add":
-            print(add_contact(args, book))
-        elif command == "change":
-            print(change_contact(args, book))
-        elif command == "phone":
-            print(show_phone(args, book))
-        elif command == "all":
-            print(show_all(book))
-        elif command == "add-birthday":
-            print(add_birthday(args, book))
-        elif command == "show-birthday":
-            print(show_birthday(args, book))
-        elif command == "birthdays":
-            print(birthdays(args, book))
-        elif command == "delete":
-            print(delete_contact(args, book))
-        else:
-            print(Fore.RED + "Невідома команда." + Style.RESET_ALL)
+    prompt = Fore.YELLOW + "Введіть команду: " + Style.RESET_ALL
+    with report.phase("доповнення вводу (readline)"):
+        if install_completion(session):
+            prompt = readline_prompt(prompt)
+    if options.startup_report:
+        report.write("усього до запрошення до вводу")
+
+    try:
+        while True:
+            user_input = input(prompt)
+
+            command, args = parse_input(user_input)
+
+            write_output(handle_command(command, args, session), pager=not options.no_pager)
+
+            if command in COMMANDS and COMMANDS[command].exits:
+                break
+    finally:
+        # Після exit книги вже закриті; сюди доходить і переривання (Ctrl+C)
+        books.close_all()
+
+    return 0
+
+_MODULE_LOADED = time.perf_counter()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
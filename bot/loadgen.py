@@ -0,0 +1,101 @@
+"""
+Генератор навантаження для серверного режиму бота (python bot.py --serve).
+
+Відкриває кілька одночасних з'єднань, кожне надсилає команди по одній
+і чекає відповіді (кінець відповіді — порожній рядок). Наприкінці виводить
+пропускну здатність і затримки (p50/p95/p99) за типами команд.
+
+Запуск:
+    python loadgen.py --clients 50 --requests 200
+    python loadgen.py --unix /tmp/bot.sock --writes 0.5
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+
+def _percentile(ordered, percent):
+    # Метод найближчого рангу
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+async def _read_response(reader):
+    """Читає одну відповідь сервера — рядки до порожнього."""
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("сервер закрив з'єднання")
+        if line == b"\n":
+            return lines
+        lines.append(line)
+
+def _commands(client, requests, writes, rng):
+    """Послідовність команд одного клієнта: частка writes — зміни книги, решта — читання."""
+    for i in range(requests):
+        name = f"Load{client:04d}x{rng.randrange(max(requests // 4, 1)):05d}"
+        if rng.random() < writes:
+            yield "add", f"add {name} {rng.randrange(10**10):010d}"
+        else:
+            kind = rng.choice(("phone", "birthdays", "search"))
+            if kind == "phone":
+                yield kind, f"phone {name}"
+            elif kind == "search":
+                yield kind, f"search {name[:6]}"
+            else:
+                yield kind, "birthdays"
+
+async def client(number, options, latencies):
+    if options.unix:
+        reader, writer = await asyncio.open_unix_connection(options.unix)
+    else:
+        reader, writer = await asyncio.open_connection(options.host, options.port)
+    try:
+        # Привітання сервера
+        await _read_response(reader)
+        rng = random.Random(number)
+        for kind, line in _commands(number, options.requests, options.writes, rng):
+            start = time.perf_counter_ns()
+            writer.write(line.encode("utf-8") + b"\n")
+            await writer.drain()
+            await _read_response(reader)
+            latencies[kind].append(time.perf_counter_ns() - start)
+        writer.write(b"exit\n")
+        await writer.drain()
+        await _read_response(reader)
+    finally:
+        writer.close()
+
+async def run(options):
+    latencies = defaultdict(list)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i, options, latencies) for i in range(options.clients)))
+    return latencies, time.perf_counter() - start
+
+def report(latencies, elapsed, stream=sys.stdout):
+    total = sum(len(samples) for samples in latencies.values())
+    stream.write(f"Запитів: {total} за {elapsed:.2f} с, {total / elapsed:.0f} запитів/с\n")
+    stream.write(f"{'Команда':<12}{'Запитів':>10}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}\n")
+    for kind in sorted(latencies):
+        ordered = sorted(latencies[kind])
+        row = "".join(f"{_percentile(ordered, p) / 1e6:>10.3f}" for p in (50, 95, 99))
+        stream.write(f"{kind:<12}{len(ordered):>10}{row}\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор навантаження для серверного режиму бота.")
+    parser.add_argument("--host", default="127.0.0.1", help="адреса сервера (за замовчуванням %(default)s)")
+    parser.add_argument("--port", type=int, default=8765, help="порт сервера (за замовчуванням %(default)s)")
+    parser.add_argument("--unix", metavar="PATH", help="підключатися через Unix-сокет замість TCP")
+    parser.add_argument("--clients", type=int, default=20, help="кількість одночасних клієнтів")
+    parser.add_argument("--requests", type=int, default=500, help="кількість запитів від кожного клієнта")
+    parser.add_argument("--writes", type=float, default=0.2, help="частка команд, що змінюють книгу (0..1)")
+    options = parser.parse_args(argv)
+
+    latencies, elapsed = asyncio.run(run(options))
+    report(latencies, elapsed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
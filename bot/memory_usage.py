@@ -0,0 +1,32 @@
+"""
+Вимірює, скільки байтів пам'яті займає один контакт в AddressBook
+(разом з індексами книги). Кожен контакт має ім'я, один телефон і день народження.
+
+Запуск: python memory_usage.py [кількість_контактів]
+"""
+import sys
+import tracemalloc
+
+from bot import AddressBook, Record
+
+def build_book(count):
+    """Створює книгу з count синтетичних контактів."""
+    book = AddressBook()
+    for i in range(count):
+        record = Record(f"Contact{i:07d}")
+        record.add_phone(f"{i:010d}")
+        record.add_birthday(f"{i % 28 + 1:02d}.{i % 12 + 1:02d}.{1950 + i % 50}")
+        book.add_record(record)
+    return book
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tracemalloc.start()
+    book = build_book(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Контактів: {len(book)}")
+    print(f"Пам'ять: {current / 2**20:.1f} MiB, {current / count:.0f} байтів на контакт")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "bot"))
+
+import bot  # noqa: E402
+
+
+@pytest.fixture
+def session():
+    """Сеанс з однією книгою в пам'яті (без файлів і журналу)."""
+    books = bot.BookCache(lambda name: bot.AddressBook(), closer=lambda book: None)
+    return bot.Session(books)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def book(request, tmp_path):
+    """Порожня книга в пам'яті або в базі SQLite."""
+    if request.param == "memory":
+        yield bot.AddressBook()
+        return
+    book = bot.SQLiteAddressBook.load_from_file(str(tmp_path / "book.db"))
+    yield book
+    book.close()
+
+
+def run(session, line):
+    """Виконує рядок команди в сеансі й повертає відповідь одним рядком."""
+    command, args = bot.parse_input(line)
+    result = bot.handle_command(command, args, session)
+    return result if isinstance(result, str) else "".join(result)
+
+
+def add(book, name, *phones):
+    """Додає до книги контакт name з телефонами phones."""
+    book.add_record(bot.Record._restore(name, list(phones), None))
+
+
+def changes(book, since=0):
+    """Стрічка змін книги як (номер, ім'я, чи існує запис)."""
+    return [(seq, name, record is not None) for seq, name, record in book.changes_since(since)]
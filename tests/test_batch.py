@@ -0,0 +1,22 @@
+import io
+
+import bot
+
+
+def test_checkpoint_counts_executed_commands(session, monkeypatch):
+    saves = []
+    monkeypatch.setattr(session.books, "save_all", lambda: saves.append(len(session.book.data)))
+    source = io.StringIO(
+        "# контакти\n"
+        "add Alice 0000000001\n"
+        "\n"
+        "add Bob 12\n"
+        "add Carol 0000000003\n"
+        "# ще коментар\n"
+        "add Dan 0000000004\n"
+        "add Eve 0000000005\n"
+    )
+    failed = bot.run_batch(source, session, checkpoint=2, output=io.StringIO(), errors=io.StringIO())
+    assert failed == 1
+    # Збереження після 2-ї та 4-ї виконаної команди і наприкінці, незалежно від номерів рядків
+    assert saves == [1, 3, 4]
@@ -0,0 +1,136 @@
+import bot
+from conftest import add, changes, run
+
+
+def test_journal_replay_keeps_change_numbers(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    add(book, "Bob", "0000000002")
+    book.find("Alice").add_phone("0000000003")
+    book.delete("Bob")
+    before = changes(book)
+    book.close()
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert changes(reloaded) == before == [(3, "Alice", True), (4, "Bob", False)]
+    assert reloaded._sequence.value == 4
+    reloaded.close()
+
+
+def test_snapshot_keeps_change_numbers(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    add(book, "Bob", "0000000002")
+    book.delete("Alice")
+    book.save_to_file(path)
+    add(book, "Carol", "0000000003")
+    before = changes(book, 1)
+    book.close()
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert changes(reloaded, 1) == before == [(2, "Bob", True), (3, "Alice", False), (4, "Carol", True)]
+    reloaded.close()
+
+
+def test_transaction_replay_keeps_change_numbers(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    with book.transaction():
+        add(book, "Bob", "0000000002")
+        book.find("Alice").add_phone("0000000003")
+        book.find("Bob").add_phone("0000000004")
+    add(book, "Carol", "0000000005")
+    before = changes(book)
+    book.close()
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert changes(reloaded) == before
+    assert [seq for seq, _, _ in before] == [2, 3, 4]
+    reloaded.close()
+
+
+def test_sharded_reload_keeps_change_numbers(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.ShardedAddressBook.load_from_file(path, 2)
+    names = [f"Name{i}" for i in range(8)]
+    for i, name in enumerate(names):
+        add(book, name, f"{i:010d}")
+    # Імена в різних шардах
+    first = next(name for name in names if book._shard(name) is book.shards[0])
+    second = next(name for name in names if book._shard(name) is book.shards[1])
+    book.delete(first)
+    book.delete(second)
+    cursor = book._sequence.value
+    before = changes(book, cursor - 2)
+    book.close()
+
+    reloaded = bot.ShardedAddressBook.load_from_file(path, 2)
+    assert reloaded._sequence.value == cursor
+    assert changes(reloaded, cursor - 2) == before == [
+        (cursor - 1, first, False), (cursor, second, False),
+    ]
+    add(reloaded, "Late", "0999999999")
+    assert changes(reloaded, cursor) == [(cursor + 1, "Late", True)]
+    reloaded.close()
+
+
+def test_sharded_transaction_reload_keeps_change_numbers(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.ShardedAddressBook.load_from_file(path, 2)
+    with book.transaction():
+        for i in range(6):
+            add(book, f"Name{i}", f"{i:010d}")
+    add(book, "Late", "0999999999")
+    before = changes(book)
+    book.close()
+
+    reloaded = bot.ShardedAddressBook.load_from_file(path, 2)
+    assert changes(reloaded) == before
+    assert sorted(seq for seq, _, _ in before) == list(range(1, 8))
+    reloaded.close()
+
+
+def test_old_tombstones_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "FEED_RETENTION", 8)
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Keep", "0000000001")
+    for i in range(20):
+        add(book, f"Temp{i}", "0000000002")
+        book.delete(f"Temp{i}")
+    tombstones = [name for _, name, exists in changes(book) if not exists]
+    # Надгробки з вікна останніх 8 змін на місці, старіші прибрано
+    assert {"Temp16", "Temp17", "Temp18", "Temp19"} <= set(tombstones)
+    assert "Temp0" not in tombstones
+    assert len(tombstones) <= 8
+    # Живі записи зі старими номерами змін лишаються в стрічці
+    assert changes(book)[0] == (1, "Keep", True)
+    book.save()
+    book.close()
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert changes(reloaded) == changes(book)
+    reloaded.close()
+
+
+def test_sqlite_old_tombstones_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "FEED_RETENTION", 8)
+    book = bot.SQLiteAddressBook.load_from_file(str(tmp_path / "book.db"))
+    for i in range(20):
+        add(book, f"Temp{i}", "0000000002")
+        book.delete(f"Temp{i}")
+    tombstones = [name for _, name, exists in changes(book) if not exists]
+    assert tombstones == ["Temp16", "Temp17", "Temp18", "Temp19"]
+    book.close()
+
+
+def test_stale_cursor_requires_full_sync(session, monkeypatch):
+    monkeypatch.setattr(bot, "FEED_RETENTION", 8)
+    for i in range(10):
+        run(session, f"add User{i} 0000000001")
+    assert "застарів" in run(session, "export-changes --since 1")
+    assert '"name": "User9"' in run(session, "export-changes --since 2")
+    assert '"name": "User0"' in run(session, "export-changes --since 0")
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import bot
+from conftest import run
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = bot.CommandStats()
+    monkeypatch.setattr(bot, "STATS", stats)
+    return stats
+
+
+def test_aliases_share_one_command():
+    assert bot.COMMANDS["exit"] is bot.COMMANDS["close"]
+    assert bot.COMMANDS["close"].exits
+
+
+def test_unknown_command_and_missing_arguments(session):
+    assert run(session, "frobnicate") == bot.error_message("Невідома команда.")
+    assert run(session, "change Alice") == bot.error_message(
+        "Введіть аргументи для команди: change <ім'я> <старий телефон> <новий телефон>"
+    )
+
+
+def test_percentiles_use_nearest_rank():
+    stats = bot.CommandStats()
+    for ms in range(1, 101):
+        stats.record("phone", ms * 1_000_000)
+    assert stats.summary() == {"phone": {"count": 100, "p50_ms": 50.0, "p95_ms": 95.0, "p99_ms": 99.0}}
+
+
+def test_samples_are_bounded():
+    stats = bot.CommandStats(max_samples=10)
+    for ms in range(100):
+        stats.record("all", ms * 1_000_000)
+    summary = stats.summary()["all"]
+    assert summary["count"] == 100
+    assert summary["p50_ms"] >= 90
+
+
+def test_handlers_are_timed(session, stats):
+    run(session, "add Alice 0123456789")
+    run(session, "add Bob 0987654321")
+    # Потокова відповідь записується, коли її дочитано
+    run(session, "all")
+    counts = {name: row["count"] for name, row in stats.summary().items()}
+    assert counts == {"add": 2, "all": 1}
+
+
+def test_stats_command_text_and_json(session, stats, tmp_path):
+    assert "Статистики ще немає" in run(session, "stats")
+    run(session, "add Alice 0123456789")
+    assert "add" in run(session, "stats")
+    data = json.loads(run(session, "stats --json"))
+    assert data["add"]["count"] == 1
+
+    path = tmp_path / "stats.json"
+    run(session, f"stats --json {path}")
+    assert json.loads(path.read_text(encoding="utf-8"))["stats"]["count"] == 3
@@ -0,0 +1,54 @@
+import bot
+from conftest import add
+
+
+def test_first_word_completes_commands(session):
+    completer = bot.Completer(session)
+    assert completer.matches("ad", 0, "ad") == ["add", "add-birthday"]
+    assert completer.matches("", 0, "") == sorted(bot.COMMANDS)
+
+
+def test_name_arguments_complete_from_index(session):
+    for name in ("Alice", "alina", "Bob"):
+        add(session.book, name, "0123456789")
+    completer = bot.Completer(session)
+    assert completer.matches("phone al", 6, "al") == ["Alice", "alina"]
+    # Другий аргумент add — телефон, його не доповнюємо
+    assert completer.matches("add Alice 01", 10, "01") == []
+    assert completer.matches("merge Alice b", 12, "b") == ["Bob"]
+    assert completer.matches("unknown al", 8, "al") == []
+
+    session.book.delete("Alice")
+    add(session.book, "Alfred", "0123456789")
+    assert completer.matches("phone al", 6, "al") == ["Alfred", "alina"]
+
+
+def test_completion_is_limited(session):
+    for i in range(20):
+        add(session.book, f"User{i:02d}", "0123456789")
+    assert len(bot.Completer(session, limit=5).matches("phone u", 6, "u")) == 5
+
+
+def test_book_still_loading_gives_no_matches(monkeypatch, session):
+    monkeypatch.setattr(session.books, "ready", lambda name: False)
+    assert bot.Completer(session).matches("phone al", 6, "al") == []
+
+
+def test_completer_follows_readline_protocol(monkeypatch, session):
+    add(session.book, "Alice", "0123456789")
+    add(session.book, "Alina", "0123456789")
+    monkeypatch.setattr(bot, "readline", type("Readline", (), {
+        "get_line_buffer": staticmethod(lambda: "phone Al"),
+        "get_begidx": staticmethod(lambda: 6),
+    }))
+    completer = bot.Completer(session)
+    assert [completer("Al", state) for state in range(3)] == ["Alice", "Alina", None]
+
+
+def test_without_readline_completion_is_skipped(monkeypatch, session):
+    monkeypatch.setattr(bot, "readline", None)
+    assert bot.install_completion(session) is False
+
+
+def test_prompt_colors_are_marked_non_printing():
+    assert bot.readline_prompt("\x1b[33mВведіть: \x1b[0m") == "\001\x1b[33m\002Введіть: \001\x1b[0m\002"
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import bot
+from conftest import add
+
+
+def start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock = bot.RWLock()
+    both_inside = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read():
+            both_inside.wait()
+
+    threads = [start(reader) for _ in range(2)]
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not both_inside.broken
+
+
+def test_writer_excludes_readers_and_writers():
+    lock = bot.RWLock()
+    events = []
+
+    def reader():
+        with lock.read():
+            events.append("read")
+
+    def writer():
+        with lock.write():
+            events.append("write")
+
+    with lock.write():
+        threads = [start(reader), start(writer)]
+        time.sleep(0.1)
+        assert events == []
+        events.append("released")
+    for thread in threads:
+        thread.join(5)
+    assert events[0] == "released"
+    assert sorted(events[1:]) == ["read", "write"]
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = bot.RWLock()
+    events = []
+    first_inside, release_first = threading.Event(), threading.Event()
+
+    def first_reader():
+        with lock.read():
+            first_inside.set()
+            release_first.wait(5)
+        events.append("first reader out")
+
+    def writer():
+        with lock.write():
+            events.append("writer")
+
+    def late_reader():
+        with lock.read():
+            events.append("late reader")
+
+    threads = [start(first_reader)]
+    assert first_inside.wait(5)
+    threads.append(start(writer))
+    time.sleep(0.1)
+    threads.append(start(late_reader))
+    time.sleep(0.1)
+    # Поки письменник чекає, новий читач не входить
+    assert events == []
+    release_first.set()
+    for thread in threads:
+        thread.join(5)
+    assert events == ["first reader out", "writer", "late reader"]
+
+
+def test_lock_is_reentrant_in_one_thread():
+    lock = bot.RWLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    with lock.read():
+        with lock.read():
+            pass
+    # Після всіх виходів блокування вільне для іншого потоку
+    acquired = threading.Event()
+
+    def writer():
+        with lock.write():
+            acquired.set()
+
+    start(writer)
+    assert acquired.wait(5)
+
+
+def test_scans_run_over_snapshot_during_writes():
+    book = bot.ConcurrentAddressBook()
+    for i in range(1000):
+        add(book, f"User{i}", f"{i:010d}")
+    errors = []
+
+    def writer():
+        for i in range(1000, 3000):
+            add(book, f"User{i}", f"{i:010d}")
+            book.delete(f"User{i - 1000}")
+
+    def scanner():
+        try:
+            while thread.is_alive():
+                names = [record.name.value for record in book.iter_records()]
+                assert len(names) == len(set(names))
+                book.get_upcoming_birthdays(30)
+        except Exception as e:
+            errors.append(e)
+
+    thread = start(writer)
+    scanners = [start(scanner) for _ in range(2)]
+    thread.join(30)
+    for scan in scanners:
+        scan.join(30)
+    assert errors == []
+    assert len(book.data) == 1000
+
+
+def test_saves_under_contention_keep_every_change(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.ConcurrentAddressBook.load_from_file(path)
+    book.compact_every = 7
+    saver = bot.AutoSaver(book, interval=3600)
+    stop = threading.Event()
+
+    def writer(prefix):
+        for i in range(200):
+            add(book, f"{prefix}{i}", f"{i:010d}")
+
+    def explicit_saves():
+        while not stop.is_set():
+            book.save()
+
+    def background_saves():
+        while not stop.is_set():
+            saver.save()
+
+    savers = [start(explicit_saves), start(background_saves)]
+    writers = [start(lambda prefix=prefix: writer(prefix)) for prefix in ("A", "B", "C")]
+    for thread in writers:
+        thread.join(30)
+    stop.set()
+    for thread in savers:
+        thread.join(30)
+    assert not any(thread.is_alive() for thread in writers + savers)
+
+    book.close()
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert len(reloaded.data) == 600
+    reloaded.close()
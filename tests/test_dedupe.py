@@ -0,0 +1,63 @@
+import bot
+from conftest import add, run
+
+
+def test_dedupe_is_staged_in_transaction(session):
+    record = bot.Record("Alice")
+    session.book.add_record(record)
+    record.phones.extend([bot.Phone("0123456789"), bot.Phone("0123456789")])
+    record._phone_map["0123456789"] = record.phones[0]
+
+    run(session, "begin")
+    assert "до транзакції" in run(session, "dedupe")
+    run(session, "rollback")
+    assert len(session.book.find("Alice").phones) == 2
+
+    run(session, "begin")
+    run(session, "dedupe")
+    assert "застосовано" in run(session, "commit")
+    assert [p.value for p in session.book.find("Alice").phones] == ["0123456789"]
+
+
+def test_import_is_refused_in_transaction(session, tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,phones,birthday\nBob,0123456789,\n", encoding="utf-8")
+    run(session, "begin")
+    assert "недоступна під час транзакції" in run(session, f"import {path}")
+    run(session, "rollback")
+    assert session.book.find("Bob") is None
+
+
+def test_sqlite_repeated_rows_are_found_and_removed(tmp_path):
+    path = str(tmp_path / "book.db")
+    book = bot.SQLiteAddressBook.load_from_file(path)
+    add(book, "Alice", "0123456789")
+    # Рядок-повтор, записаний до заборони повторних номерів
+    book._conn.execute("INSERT INTO phones (name, position, number) VALUES ('Alice', 1, '0123456789')")
+    book._conn.commit()
+    book.close()
+
+    book = bot.SQLiteAddressBook.load_from_file(path)
+    assert bot.find_duplicates(book)[0] == ["Alice"]
+    assert "Прибрано повторних номерів: 1" in bot.dedupe([], book)
+    book.close()
+
+    book = bot.SQLiteAddressBook.load_from_file(path)
+    assert book._conn.execute("SELECT count(*) FROM phones").fetchone()[0] == 1
+    assert bot.find_duplicates(book)[0] == []
+    book.close()
+
+
+def test_duplicates_report_is_shown_in_transaction(session):
+    run(session, "add Alice 0123456789")
+    run(session, "add Bob 0123456789")
+    record = session.book.find("Alice")
+    record.phones.append(bot.Phone("0123456789"))
+
+    run(session, "begin")
+    report = run(session, "duplicates")
+    assert "Контакти з повторними номерами: 1" in report
+    assert "0123456789: Alice, Bob" in report
+    assert "до транзакції" in run(session, "dedupe")
+    run(session, "commit")
+    assert "Контакти з повторними номерами" not in run(session, "duplicates")
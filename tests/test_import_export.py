@@ -0,0 +1,26 @@
+import bot
+from conftest import add
+
+
+def test_csv_name_with_whitespace_is_rejected(tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,phones,birthday\nJohn Smith,0123456789,\nBob,0123456789,\n",
+                    encoding="utf-8")
+    book = bot.AddressBook()
+    imported, rejected, rejects_path = bot.import_contacts(book, str(path))
+    assert (imported, rejected) == (1, 1)
+    assert book.find("John Smith") is None
+    assert "пробіли" in open(rejects_path, encoding="utf-8").read()
+
+
+def test_vcard_round_trip_escapes_name(tmp_path):
+    path = str(tmp_path / "contacts.vcf")
+    book = bot.AddressBook()
+    add(book, "Smith,John;Jr\\", "0123456789")
+    assert bot.export_contacts(book, path) == 1
+    assert "FN:Smith\\,John\\;Jr\\\\\r\n" in open(path, encoding="utf-8", newline="").read()
+
+    restored = bot.AddressBook()
+    assert bot.import_contacts(restored, path)[:2] == (1, 0)
+    record = restored.find("Smith,John;Jr\\")
+    assert [phone.value for phone in record.phones] == ["0123456789"]
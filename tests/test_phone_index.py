@@ -0,0 +1,43 @@
+import bot
+from conftest import add, run
+
+
+def test_index_follows_every_change(book):
+    add(book, "Alice", "0000000001", "0000000002")
+    add(book, "Bob", "0000000001")
+    assert book.find_by_phone("0000000001") == ["Alice", "Bob"]
+
+    book.find("Alice").edit_phone("0000000001", "0000000003")
+    assert book.find_by_phone("0000000001") == ["Bob"]
+    assert book.find_by_phone("0000000003") == ["Alice"]
+
+    book.find("Alice").add_phone("0000000004")
+    book.find("Alice").remove_phone("0000000002")
+    assert book.find_by_phone("0000000004") == ["Alice"]
+    assert book.find_by_phone("0000000002") == []
+
+    book.delete("Bob")
+    assert book.find_by_phone("0000000001") == []
+
+
+def test_replaced_record_leaves_index():
+    book = bot.AddressBook()
+    add(book, "Alice", "0000000001")
+    add(book, "Alice", "0000000002")
+    assert book.find_by_phone("0000000001") == []
+    assert book.find_by_phone("0000000002") == ["Alice"]
+
+
+def test_record_find_phone_uses_its_own_index():
+    record = bot.Record("Alice")
+    record.add_phone("0000000001")
+    record.edit_phone("0000000001", "0000000002")
+    assert record.find_phone("0000000001") is None
+    assert record.find_phone("0000000002") is record.phones[0]
+
+
+def test_find_phone_command(session):
+    run(session, "add Alice 0123456789")
+    run(session, "add Bob 0123456789")
+    assert "Alice, Bob" in run(session, "find-phone 0123456789")
+    assert "не знайдено" in run(session, "find-phone 0000000000")
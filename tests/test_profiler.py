@@ -0,0 +1,60 @@
+import io
+import pstats
+import tracemalloc
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def commands():
+    def listing(args, book):
+        return (f"line {i}" for i in range(3))
+
+    return {"demo": bot.Command("demo", lambda args, book: "done"), "listing": bot.Command("listing", listing)}
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    tracemalloc.stop()
+
+
+def test_profile_dumps_pstats_per_call(tmp_path, commands):
+    bot.CommandProfiler(str(tmp_path), profile=True).install(commands)
+    assert commands["demo"]([], None) == "done"
+    assert list(commands["listing"]([], None)) == ["line 0", "line 1", "line 2"]
+
+    dumps = sorted(path.name for path in tmp_path.iterdir())
+    assert dumps == ["00001-demo.prof", "00002-listing.prof"]
+    stats = pstats.Stats(str(tmp_path / "00002-listing.prof"))
+    # Потокову відповідь дочитано під профілюванням
+    assert "<genexpr>" in {function for _, _, function in stats.stats}
+
+
+def test_slow_commands_dump_allocations(tmp_path, commands):
+    bot.CommandProfiler(str(tmp_path), slow_ms=0).install(commands)
+    commands["demo"]([], None)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["00001-demo.tracemalloc", "00001-demo.txt"]
+    assert tracemalloc.Snapshot.load(str(tmp_path / "00001-demo.tracemalloc"))
+    assert "Команда: demo" in (tmp_path / "00001-demo.txt").read_text(encoding="utf-8")
+
+
+def test_fast_commands_are_not_dumped(tmp_path, commands):
+    bot.CommandProfiler(str(tmp_path), slow_ms=60_000).install(commands)
+    commands["demo"]([], None)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_commands_are_not_wrapped_without_options(tmp_path, monkeypatch):
+    installed = []
+    monkeypatch.setattr(bot.CommandProfiler, "install", lambda self, commands: installed.append(self))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.stdin", io.StringIO("add Alice 0123456789\n"))
+    assert bot.main(["--batch", "-"]) == 0
+    assert installed == []
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("add Bob 0123456789\n"))
+    assert bot.main(["--batch", "-", "--trace-slow", "50", "--profile-dir", str(tmp_path / "prof")]) == 0
+    assert len(installed) == 1
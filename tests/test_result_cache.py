@@ -0,0 +1,56 @@
+import bot
+from conftest import add, run
+
+
+def test_lru_evicts_by_entries_and_size():
+    cache = bot.ResultCache(max_entries=2, max_chars=10)
+    cache.put(("all", 1), ("aaa",))
+    cache.put(("all", 2), ("bbb",))
+    assert cache.get(("all", 1)) == ("aaa",)
+    cache.put(("all", 3), ("ccc",))
+    # Витісняється найдавніше використана відповідь
+    assert cache.get(("all", 2)) is None
+    assert cache.get(("all", 1)) == ("aaa",)
+
+    cache.put(("all", 4), ("dddddddd",))
+    assert len(cache) == 1
+    # Відповідь, більша за весь кеш, не зберігається
+    cache.put(("all", 5), ("x" * 11,))
+    assert cache.get(("all", 5)) is None
+
+
+def test_every_write_path_bumps_version():
+    book = bot.AddressBook()
+    versions = [book._version]
+
+    def changed():
+        assert book._version > versions[-1]
+        versions.append(book._version)
+
+    add(book, "Alice", "0000000001")
+    changed()
+    record = book.find("Alice")
+    record.add_phone("0000000002")
+    changed()
+    record.edit_phone("0000000002", "0000000003")
+    changed()
+    record.remove_phone("0000000003")
+    changed()
+    record.add_birthday("01.02.2000")
+    changed()
+    book.delete("Alice")
+    changed()
+
+
+def test_repeated_queries_hit_until_book_changes(session):
+    run(session, "add Alice 0123456789")
+    first = run(session, "all")
+    assert run(session, "all") == first
+    run(session, "add Alice 0987654321")
+    assert "0987654321" in run(session, "all")
+    run(session, "birthdays")
+    run(session, "birthdays")
+    summary = session.book._results.summary()
+    assert summary["all"] == {"hits": 1, "misses": 2, "hit_rate": 0.333}
+    assert summary["birthdays"]["hits"] == 1
+    assert "all" in run(session, "cache-stats")
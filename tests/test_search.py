@@ -0,0 +1,51 @@
+import bot
+from conftest import add, run
+
+
+def fill(book):
+    for i, name in enumerate(["Alice", "alina", "Albert", "Олена", "Олег", "Bob"]):
+        add(book, name, f"{i:010d}")
+
+
+def test_prefix_search_ignores_case(book):
+    fill(book)
+    names, total = book.search("AL")
+    assert sorted(names) == ["Albert", "Alice", "alina"]
+    assert total == 3
+    assert book.search("оле")[1] == 2
+    assert book.search("Z") == ([], 0)
+
+
+def test_prefix_search_limit_keeps_total(book):
+    fill(book)
+    names, total = book.search("al", limit=2)
+    assert len(names) == 2
+    assert total == 3
+
+
+def test_prefix_search_normalizes_unicode(book):
+    # «й» як одна літера і як «и» з комбінованим знаком
+    add(book, "Йосип", "0000000001")
+    assert book.search("йо")[0] == ["Йосип"]
+    assert book.search("\u0438\u0306о")[0] == ["Йосип"]
+
+
+def test_index_follows_adds_and_deletes(book):
+    fill(book)
+    book.delete("Alice")
+    add(book, "Alfred", "0000000009")
+    assert sorted(book.search("al")[0]) == ["Albert", "Alfred", "alina"]
+
+
+def test_fuzzy_search_finds_typos(book):
+    fill(book)
+    assert "Alice" in book.search_fuzzy("Alcie")
+    assert "Олена" in book.search_fuzzy("Олна")
+    assert book.search_fuzzy("Zzzzz") == []
+
+
+def test_search_command(session):
+    fill(session.book)
+    assert "Знайдено контактів: 2" in run(session, "search оле")
+    assert "Alice" in run(session, "search ~Alise")
+    assert "не знайдено" in run(session, "search ~qqqqqq")
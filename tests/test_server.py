@@ -0,0 +1,36 @@
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def server(session):
+    return bot.BotServer(session.books)
+
+
+def test_blank_line_gets_single_terminator(server, session):
+    assert server.execute("\n", session) == (b"\n", False)
+    response, done = server.execute("hello\n", session)
+    assert response.endswith(b"\n\n") and response.count(b"\n\n") == 1
+
+
+@pytest.mark.parametrize("line", [
+    "export {path}",
+    "import {path}",
+    "apply {path}",
+    "stats --json {path}",
+    "export-changes {path}",
+    "export-changes --since 0 {path}",
+])
+def test_file_commands_are_refused(server, session, tmp_path, line):
+    path = tmp_path / "out.csv"
+    response, done = server.execute(line.format(path=path), session)
+    assert "недоступна через мережу" in response.decode("utf-8")
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("line", ["stats --json", "export-changes --since 0", "export-changes"])
+def test_output_only_variants_still_work(server, session, line):
+    server.execute("add Alice 0123456789", session)
+    response, done = server.execute(line, session)
+    assert "недоступна" not in response.decode("utf-8")
@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+import bot
+from conftest import add
+
+NAMES = [f"User{i:02d}" for i in range(40)]
+
+
+def fill(book):
+    for i, name in enumerate(NAMES):
+        add(book, name, f"{i % 10:010d}")
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.ShardedAddressBook.load_from_file(path, 4)
+    fill(book)
+    book.close()
+    return path
+
+
+@pytest.mark.parametrize("parallel", [False, True], ids=["in-process", "process-pool"])
+def test_shards_load_in_parallel(sharded, monkeypatch, parallel):
+    if parallel:
+        monkeypatch.setattr(bot.ShardedAddressBook, "parallel_min_bytes", 0)
+    book = bot.ShardedAddressBook.load_from_file(sharded, 4, workers=2)
+    assert len(book) == len(NAMES)
+    assert sorted(book) == NAMES
+    assert all(len(shard) for shard in book.shards)
+    book.close()
+
+
+def test_single_name_touches_its_own_shard(sharded):
+    book = bot.ShardedAddressBook.load_from_file(sharded, 4)
+    shard = book._shard("User07")
+    assert "User07" in shard.data
+    assert sum("User07" in other.data for other in book.shards) == 1
+    add(book, "New", "0999999999")
+    assert "New" in book._shard("New").data
+    book.delete("User07")
+    assert book.find("User07") is None
+    book.close()
+
+
+def test_whole_book_queries_merge_shards(sharded):
+    book = bot.ShardedAddressBook.load_from_file(sharded, 4)
+    assert book.find_by_phone("0000000003") == ["User03", "User13", "User23", "User33"]
+    assert [record.name.value for record in book.iter_records(sort="name", limit=3)] == NAMES[:3]
+    assert book.search("user1") == (NAMES[10:20], 10)
+
+    today = date.today()
+    book.find("User05").add_birthday(today.strftime("%d.%m.2000"))
+    book.find("User30").add_birthday(today.strftime("%d.%m.1990"))
+    upcoming = book.get_upcoming_birthdays(0)
+    assert sorted(name for names in upcoming.values() for name in names) == ["User05", "User30"]
+    book.close()
+
+
+def test_shard_count_must_match(sharded):
+    with pytest.raises(bot.UserError, match="4 шардів"):
+        bot.ShardedAddressBook.load_from_file(sharded, 3)
+
+
+def test_plain_book_is_split_once(tmp_path):
+    path = str(tmp_path / "book.bin")
+    plain = bot.AddressBook.load_from_file(path)
+    fill(plain)
+    plain.save()
+    plain.close()
+
+    book = bot.ShardedAddressBook.load_from_file(path, 4)
+    assert sorted(book) == NAMES
+    book.close()
+    assert (tmp_path / "book.bin.unsharded").exists()
+    assert sorted(bot.ShardedAddressBook.load_from_file(path, 4)) == NAMES
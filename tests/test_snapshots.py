@@ -0,0 +1,149 @@
+import json
+import os
+import struct
+import zlib
+
+import bot
+from conftest import add, changes, run
+
+
+def contents(book):
+    return [
+        (record.name.value, [phone.value for phone in record.phones],
+         record.birthday.value if record.birthday else None)
+        for record in book.iter_records()
+    ]
+
+
+def filled_book():
+    book = bot.AddressBook()
+    add(book, "Alice", "0000000001", "0000000002")
+    add(book, "Богдан", "0000000003")
+    add(book, "Carol")
+    book.find("Alice").add_birthday("01.02.2000")
+    book.delete("Carol")
+    return book
+
+
+def test_journal_replay_restores_changes(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    add(book, "Bob", "0000000002")
+    book.find("Alice").add_birthday("01.02.2000")
+    book.find("Bob").edit_phone("0000000002", "0000000009")
+    book.delete("Alice")
+    add(book, "Carol", "0000000003")
+    before = contents(book)
+    book.close()
+
+    assert not os.path.exists(path)
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert contents(reloaded) == before == [("Bob", ["0000000009"], None), ("Carol", ["0000000003"], None)]
+    assert reloaded.find_by_phone("0000000009") == ["Bob"]
+    reloaded.close()
+
+
+def test_torn_journal_tail_is_truncated(tmp_path):
+    path = str(tmp_path / "book.bin")
+    journal = path + ".journal"
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    add(book, "Bob", "0000000002")
+    book.close()
+    intact = os.path.getsize(journal)
+    # Збій посеред запису: рядок без завершального переведення рядка
+    with open(journal, "ab") as f:
+        f.write(b'{"seq": 3, "op": "add", "name": "Ca')
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert [name for name, _, _ in contents(reloaded)] == ["Alice", "Bob"]
+    assert os.path.getsize(journal) == intact
+    add(reloaded, "Carol", "0000000003")
+    reloaded.close()
+
+    again = bot.AddressBook.load_from_file(path)
+    assert [name for name, _, _ in contents(again)] == ["Alice", "Bob", "Carol"]
+    again.close()
+
+
+def test_snapshot_v2_round_trip():
+    book = filled_book()
+    restored = bot.decode_book(bot.encode_book(book), bot.AddressBook)
+    assert contents(restored) == contents(book)
+    assert changes(restored) == changes(book) == [(2, "Богдан", True), (4, "Alice", True), (5, "Carol", False)]
+    assert restored._sequence.value == book._sequence.value
+
+
+def to_version_1(data, count):
+    """
+    Відрізає від знімка версії 2 без надгробків стрічку змін
+    (24 + 8 * count байтів) і переписує заголовок як версію 1.
+    """
+    header = bot._BOOK_HEADER
+    magic, _version, flags, _crc, journal_seq, records = header.unpack_from(data)
+    body = data[header.size:len(data) - (24 + 8 * count)]
+    return header.pack(magic, 1, flags, zlib.crc32(body), journal_seq, records) + body
+
+
+def test_snapshot_v1_is_read():
+    book = bot.AddressBook()
+    add(book, "Alice", "0000000001", "0000000002")
+    add(book, "Bob", "0000000003")
+    book.find("Bob").add_birthday("29.02.2004")
+    # Стрічка змін версії 1 не знала: змінені записи без надгробків
+    book._changed = {name: seq for seq, name in enumerate(book.data, 1)}
+    data = to_version_1(bot.encode_book(book), len(book.data))
+    assert struct.unpack_from("<H", data, 8)[0] == 1
+
+    restored = bot.decode_book(data, bot.AddressBook)
+    assert contents(restored) == contents(book)
+    # Кожен запис вважається зміненим один раз, у порядку додавання
+    assert changes(restored) == [(1, "Alice", True), (2, "Bob", True)]
+    assert restored._sequence.value == 2
+
+
+def test_snapshot_file_round_trip_with_journal_tail(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    book.save_to_file(path)
+    add(book, "Bob", "0000000002")
+    before = contents(book)
+    book.close()
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert contents(reloaded) == before
+    reloaded.close()
+
+
+def test_corrupt_snapshot_falls_back_to_backup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0000000001")
+    book.save_to_file(path)
+    add(book, "Bob", "0000000002")
+    book.save_to_file(path)
+    book.close()
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert os.path.exists(path + ".corrupt")
+    assert "Alice" in reloaded.data
+    reloaded.close()
+
+
+def test_add_command_journals_one_entry(tmp_path):
+    path = str(tmp_path / "book.bin")
+    books = bot.BookCache(lambda name: bot.AddressBook.load_from_file(path))
+    session = bot.Session(books)
+    run(session, "add Alice 0123456789")
+    run(session, "add Alice 0987654321")
+    with open(path + ".journal", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert [(entry["op"], entry.get("phones", entry.get("args"))) for entry in entries] == [
+        ("add_record", ["0123456789"]), ("add_phone", ["0987654321"]),
+    ]
+    books.close_all()
@@ -0,0 +1,59 @@
+import builtins
+
+import pytest
+
+import bot
+from conftest import add
+
+
+def run_main(monkeypatch, argv, lines):
+    """Запускає діалоговий режим main з рядками вводу lines."""
+    feed = iter(lines)
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(feed))
+    monkeypatch.setattr(bot, "install_completion", lambda session: False)
+    return bot.main(["--no-color", "--no-pager", *argv])
+
+
+@pytest.mark.parametrize("storage", [
+    ["--storage", "pickle", "--autosave", "0"],
+    ["--storage", "pickle"],
+    ["--storage", "pickle", "--shards", "2"],
+    ["--storage", "sqlite"],
+], ids=["pickle", "autosave", "sharded", "sqlite"])
+def test_background_load(tmp_path, monkeypatch, capsys, storage):
+    monkeypatch.chdir(tmp_path)
+    assert run_main(monkeypatch, storage, ["add Alice 0123456789", "exit"]) == 0
+    assert "Виникла непередбачена помилка" not in capsys.readouterr().out
+
+    code = run_main(monkeypatch, ["--background-load", *storage], ["phone Alice", "add Bob 0987654321", "exit"])
+    out = capsys.readouterr().out
+    assert code == 0
+    assert "0123456789" in out
+    assert "Виникла непередбачена помилка" not in out
+
+    assert run_main(monkeypatch, storage, ["phone Bob", "exit"]) == 0
+    assert "0987654321" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_max_books_must_be_positive(value, capsys):
+    with pytest.raises(SystemExit):
+        bot.parse_args(["--max-books", value])
+    assert "--max-books" in capsys.readouterr().err
+    assert bot.parse_args(["--max-books", "1"]).max_books == 1
+
+
+def test_migrate_uses_book_option(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    for name, contact in (("address_book", "Default"), ("work", "Colleague")):
+        book = bot.AddressBook.load_from_file(bot.book_path(name, "pickle"))
+        add(book, contact, "0123456789")
+        book.save()
+        book.close()
+
+    assert bot.main(["--migrate", "--book", "work"]) == 0
+    assert "work.db" in capsys.readouterr().out
+    assert not (tmp_path / "address_book.db").exists()
+    migrated = bot.SQLiteAddressBook.load_from_file("work.db")
+    assert list(migrated) == ["Colleague"]
+    migrated.close()
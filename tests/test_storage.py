@@ -0,0 +1,190 @@
+import base64
+import os
+import pickle
+import threading
+
+import pytest
+
+import bot
+from conftest import add
+
+# Знімки pickle, збережені версіями бота до двійкового формату:
+# Ann (0123456789, 0987654321, 01.02.2000) і Bob (0555555555)
+BASELINE_PICKLE = (
+    "gASVHgEAAAAAAACMA2JvdJSMC0FkZHJlc3NCb29rlJOUKYGUfZSMBGRhdGGUfZQojANBbm6UaACMBlJlY29yZJST"
+    "lCmBlH2UKIwEbmFtZZRoAIwETmFtZZSTlCmBlH2UjAZfdmFsdWWUaAdzYowGcGhvbmVzlF2UKGgAjAVQaG9uZZST"
+    "lCmBlH2UaBGMCjAxMjM0NTY3ODmUc2JoFSmBlH2UaBGMCjA5ODc2NTQzMjGUc2JljAhiaXJ0aGRheZRoAIwIQmly"
+    "dGhkYXmUk5QpgZR9lGgRjAowMS4wMi4yMDAwlHNidWKMA0JvYpRoCSmBlH2UKGgMaA4pgZR9lGgRaCJzYmgSXZRo"
+    "FSmBlH2UaBGMCjA1NTU1NTU1NTWUc2JhaBxOdWJ1c2Iu"
+)
+
+BASELINE_PICKLE_PROTOCOL_0 = (
+    "Y2NvcHlfcmVnCl9yZWNvbnN0cnVjdG9yCnAwCihjYm90CkFkZHJlc3NCb29rCnAxCmNfX2J1aWx0aW5fXwpvYmpl"
+    "Y3QKcDIKTnRwMwpScDQKKGRwNQpWZGF0YQpwNgooZHA3ClZBbm4KcDgKZzAKKGNib3QKUmVjb3JkCnA5CmcyCk50"
+    "cDEwClJwMTEKKGRwMTIKVm5hbWUKcDEzCmcwCihjYm90Ck5hbWUKcDE0CmcyCk50cDE1ClJwMTYKKGRwMTcKVl92"
+    "YWx1ZQpwMTgKZzgKc2JzVnBob25lcwpwMTkKKGxwMjAKZzAKKGNib3QKUGhvbmUKcDIxCmcyCk50cDIyClJwMjMK"
+    "KGRwMjQKZzE4ClYwMTIzNDU2Nzg5CnAyNQpzYmFnMAooZzIxCmcyCk50cDI2ClJwMjcKKGRwMjgKZzE4ClYwOTg3"
+    "NjU0MzIxCnAyOQpzYmFzVmJpcnRoZGF5CnAzMApnMAooY2JvdApCaXJ0aGRheQpwMzEKZzIKTnRwMzIKUnAzMwoo"
+    "ZHAzNApnMTgKVjAxLjAyLjIwMDAKcDM1CnNic2JzVkJvYgpwMzYKZzAKKGc5CmcyCk50cDM3ClJwMzgKKGRwMzkK"
+    "ZzEzCmcwCihnMTQKZzIKTnRwNDAKUnA0MQooZHA0MgpnMTgKZzM2CnNic2cxOQoobHA0MwpnMAooZzIxCmcyCk50"
+    "cDQ0ClJwNDUKKGRwNDYKZzE4ClYwNTU1NTU1NTU1CnA0NwpzYmFzZzMwCk5zYnNzYi4="
+)
+
+CONCURRENT_PICKLE = (
+    "gASVMQEAAAAAAACMA2JvdJSMFUNvbmN1cnJlbnRBZGRyZXNzQm9va5STlCmBlH2UKIwEZGF0YZR9lCiMA0FubpRo"
+    "AIwGUmVjb3JklJOUKYGUfZQojARuYW1llGgAjAROYW1llJOUKYGUfZSMBl92YWx1ZZRoB3NijAZwaG9uZXOUXZQo"
+    "aACMBVBob25llJOUKYGUfZRoEYwKMDEyMzQ1Njc4OZRzYmgVKYGUfZRoEYwKMDk4NzY1NDMyMZRzYmWMCGJpcnRo"
+    "ZGF5lGgAjAhCaXJ0aGRheZSTlCmBlH2UaBFKJyQLAHNidWKMA0JvYpRoCSmBlH2UKGgMaA4pgZR9lGgRaCFzYmgS"
+    "XZRoFSmBlH2UaBGMCjA1NTU1NTU1NTWUc2JhaBxOdWJ1jAtqb3VybmFsX3NlcZRLAHViLg=="
+)
+
+
+@pytest.mark.parametrize("kind", ["pickle", "sqlite", "sharded"])
+def test_close_without_changes_keeps_snapshot(tmp_path, kind):
+    path = str(tmp_path / ("book.db" if kind == "sqlite" else "book.bin"))
+
+    def load():
+        if kind == "sqlite":
+            return bot.SQLiteAddressBook.load_from_file(path)
+        if kind == "sharded":
+            return bot.ShardedAddressBook.load_from_file(path, 2)
+        return bot.AddressBook.load_from_file(path)
+
+    book = load()
+    add(book, "Alice", "0123456789")
+    assert book.has_unsaved_changes() or kind == "sqlite"
+    bot.flush_and_close(book)
+
+    book = load()
+    assert not book.has_unsaved_changes()
+    # Знімок і його резервна копія (у SQLite -wal і -shm зникають під час закриття бази)
+    files = [name for name in os.listdir(tmp_path) if not name.endswith(("-wal", "-shm"))]
+    stamps = {name: os.stat(tmp_path / name).st_mtime_ns for name in files}
+    bot.flush_and_close(book)
+    assert {name: os.stat(tmp_path / name).st_mtime_ns for name in files} == stamps
+
+
+def test_close_with_changes_writes_snapshot(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.AddressBook.load_from_file(path)
+    add(book, "Alice", "0123456789")
+    bot.flush_and_close(book)
+    assert os.path.getsize(path + ".journal") == 0
+    assert bot.AddressBook.load_from_file(path).find("Alice") is not None
+
+
+@pytest.mark.parametrize("blob", [BASELINE_PICKLE, BASELINE_PICKLE_PROTOCOL_0, CONCURRENT_PICKLE])
+def test_legacy_pickle_is_migrated(tmp_path, blob):
+    path = tmp_path / "book.bin"
+    path.write_bytes(base64.b64decode("".join(blob)))
+    book = bot.AddressBook.load_from_file(str(path))
+    assert [p.value for p in book.find("Ann").phones] == ["0123456789", "0987654321"]
+    assert book.find("Ann").birthday.value == "01.02.2000"
+    assert [p.value for p in book.find("Bob").phones] == ["0555555555"]
+    assert book.find_by_phone("0555555555") == ["Bob"]
+    book.close()
+    assert path.read_bytes().startswith(bot.BOOK_MAGIC)
+    assert (tmp_path / "book.bin.bak").read_bytes() == base64.b64decode("".join(blob))
+
+
+class _Payload:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return open, (self.path, "w")
+
+
+def test_crafted_pickle_is_not_executed(tmp_path):
+    path = tmp_path / "book.bin"
+    created = tmp_path / "pwned"
+    path.write_bytes(pickle.dumps(_Payload(str(created))))
+    with pytest.raises(ValueError, match="пошкоджено"):
+        bot.AddressBook.load_from_file(str(path))
+    assert not created.exists()
+    assert path.exists()
+
+
+def test_autosave_and_explicit_save_do_not_interleave(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.ConcurrentAddressBook.load_from_file(path)
+    saver = bot.AutoSaver(book, interval=3600)
+    add(book, "Alice", "0000000001")
+
+    # Фонове збереження зупиняється посеред запису знімка
+    gate, writing = threading.Event(), threading.Event()
+    write_snapshot = book._write_snapshot
+
+    def slow_write(filename, data):
+        writing.set()
+        gate.wait(5)
+        write_snapshot(filename, data)
+
+    book._write_snapshot = slow_write
+    background = threading.Thread(target=saver.save)
+    background.start()
+    assert writing.wait(5)
+    book._write_snapshot = write_snapshot
+
+    add(book, "Bob", "0000000002")
+    explicit = threading.Thread(target=book.save)
+    explicit.start()
+    explicit.join(0.2)
+    assert explicit.is_alive()
+    gate.set()
+    background.join(5)
+    explicit.join(5)
+
+    add(book, "Carol", "0000000003")
+    book.close()
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert sorted(reloaded.data) == ["Alice", "Bob", "Carol"]
+
+
+def test_explicit_save_and_inline_compaction_do_not_deadlock(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = bot.ConcurrentAddressBook.load_from_file(path)
+    book.compact_every = 5
+    stop = threading.Event()
+
+    def save_loop():
+        while not stop.is_set():
+            book.save()
+
+    def write_loop():
+        for i in range(300):
+            add(book, f"User{i}", f"{i:010d}")
+
+    saver = threading.Thread(target=save_loop, daemon=True)
+    writer = threading.Thread(target=write_loop, daemon=True)
+    saver.start()
+    writer.start()
+    writer.join(20)
+    stop.set()
+    saver.join(20)
+    assert not writer.is_alive() and not saver.is_alive()
+
+    book.close()
+    reloaded = bot.AddressBook.load_from_file(path)
+    assert len(reloaded.data) == 300
+
+
+def test_sqlite_keeps_bounded_record_cache(tmp_path):
+    path = str(tmp_path / "book.db")
+    book = bot.SQLiteAddressBook.load_from_file(path)
+    book.cache_size = 8
+    with book.deferred_writes():
+        for i in range(100):
+            add(book, f"User{i}", f"{i:010d}")
+    assert len(book.data) == 8
+    assert len(book) == 100
+
+    for i in range(20):
+        book.find(f"User{i}")
+    assert list(book.data) == [f"User{i}" for i in range(12, 20)]
+
+    book.find("User1").add_phone("0999999999")
+    book.close()
+    reloaded = bot.SQLiteAddressBook.load_from_file(path)
+    assert [phone.value for phone in reloaded.find("User1").phones] == ["0000000001", "0999999999"]
+    reloaded.close()
@@ -0,0 +1,61 @@
+import bot
+from conftest import add, run
+
+
+def fill(book, *names):
+    for i, name in enumerate(names):
+        add(book, name, f"{i:010d}")
+
+
+def test_commit_applies_all_changes(session):
+    fill(session.book, "Alice")
+    run(session, "begin")
+    run(session, "add Bob 0987654321")
+    run(session, "delete Alice")
+    assert "застосовано" in run(session, "commit")
+    assert list(session.book.data) == ["Bob"]
+
+
+def test_failed_commit_restores_book(session):
+    fill(session.book, "Alice", "Carol")
+    run(session, "begin")
+    run(session, "change Alice 0000000000 5555555555")
+    run(session, "delete Carol")
+    run(session, "delete Nobody")
+    assert "Транзакцію скасовано" in run(session, "commit")
+    assert list(session.book.data) == ["Alice", "Carol"]
+    assert session.book.find("Alice").phones[0].value == "0000000000"
+
+
+def test_rollback_after_add_then_delete_keeps_order(session):
+    fill(session.book, "Alice", "Carol")
+    run(session, "begin")
+    run(session, "add New 1111111111")
+    run(session, "delete Alice")
+    run(session, "delete Nobody")
+    assert "Транзакцію скасовано" in run(session, "commit")
+    assert list(session.book.data) == ["Alice", "Carol"]
+    assert session.book.search("New") == ([], 0)
+
+
+def test_rollback_command_discards_staged_changes(session):
+    run(session, "begin")
+    run(session, "add Bob 0987654321")
+    assert "відкинуто змін: 1" in run(session, "rollback")
+    assert session.book.find("Bob") is None
+
+
+def test_book_transaction_rolls_back_on_exception():
+    book = bot.AddressBook()
+    fill(book, "Alice", "Bob")
+    try:
+        with book.transaction():
+            add(book, "Zed", "2222222222")
+            book.delete("Alice")
+            book.find("Bob").add_phone("3333333333")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert list(book.data) == ["Alice", "Bob"]
+    assert [p.value for p in book.find("Bob").phones] == ["0000000001"]
+    assert book.search("") == (["Alice", "Bob"], 2)
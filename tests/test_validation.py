@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import pytest
+
+import bot
+from conftest import run
+
+
+@pytest.mark.parametrize("phone", ["¹²³⁴⁵⁶⁷⁸⁹⁰", "٠١٢٣٤٥٦٧٨٩", "01234５6789", "012345678", "01234567890"])
+def test_phone_requires_ten_ascii_digits(session, phone):
+    assert "10 цифр" in run(session, f"add X {phone}")
+    assert session.book.find("X") is None
+
+
+def test_valid_phone_is_saved(session, tmp_path):
+    run(session, "add X 0123456789")
+    session.book.save_to_file(str(tmp_path / "book.bin"))
+    assert bot.AddressBook.load_from_file(str(tmp_path / "book.bin")).find("X") is not None
+
+
+def test_birthday_requires_ascii_digits(session):
+    run(session, "add X 0123456789")
+    assert "DD.MM.YYYY" in run(session, "add-birthday X ٠١.٠١.٢٠٠٠")
+    assert session.book.find("X").birthday is None
+
+
+def test_numeric_options_require_ascii_digits(session):
+    assert "невід'ємне ціле" in run(session, "all --limit ²")
+    assert "невід'ємне ціле" in run(session, "export-changes --since ³")
+
+
+def test_only_user_errors_are_shown_verbatim():
+    @bot.input_error
+    def handler(error):
+        raise error
+
+    assert "Номер телефону" in handler(bot.UserError("Номер телефону повинен містити 10 цифр."))
+    # Внутрішня помилка не показується користувачу, навіть якщо схожа на повідомлення для нього
+    internal = handler(ValueError("Файл обірваний: внутрішня деталь"))
+    assert "внутрішня деталь" not in internal
+    assert "Введіть ім'я та номер телефону" in internal
+
+
+@pytest.mark.parametrize("days", ["365", "100000000000", "-1", "³", "7.5"])
+def test_birthdays_window_is_bounded(session, days):
+    assert "Кількість днів" in run(session, f"birthdays {days}")
+
+
+def test_birthdays_full_window_lists_each_birthday_once(session):
+    today = date.today()
+    for name, day in (("Alice", today), ("Bob", today + timedelta(days=1))):
+        run(session, f"add {name} 0123456789")
+        run(session, f"add-birthday {name} {day.day:02d}.{day.month:02d}.2000")
+    result = run(session, f"birthdays {bot.MAX_BIRTHDAY_WINDOW}")
+    assert result.count("Alice") == 1
+    assert result.count("Bob") == 1